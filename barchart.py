@@ -1,89 +1,91 @@
 # barchart.py
 """Bar Chart"""
 
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.figure import Figure
 from pathlib import Path
 
+from categories import order_categories, thin_ticks, tick_label_pixels
+from chartdata import load_aggregated
+from charts import show_figure
+from instrument import stage
+from layout import fit_layout, tight_bbox
+from themes import get_theme
+
 # ============================================
 # CONFIGURATION - Change mode here
 # ============================================
 MODE = 'light'  # Options: 'dark' or 'light'
+SHOW = False    # Open a preview window after saving
 # ============================================
 
+CSV_FILE = Path("data") / "monthly_sales.csv"
+DATA_KEY = 'totals by Month'  # Charts with the same CSV_FILE and DATA_KEY share one loaded frame
+OUTPUT_NAME = "barchart"
+DPI = 72
+FIGSIZE = (6, 4)
+
 
-def load_data():
+def load_data(csv_file=CSV_FILE):
     """Load data from CSV file."""
-    CSV_FILE = Path("data") / "monthly_sales.csv"
-    
     # Check if file exists
-    if not CSV_FILE.exists():
-        raise FileNotFoundError(f"{CSV_FILE} not found")
-    
-    # Load and return the dataframe
-    df = pd.read_csv(CSV_FILE)
+    if not csv_file.exists():
+        raise FileNotFoundError(f"{csv_file} not found")
+
+    # Stream the file, summing Sales per Month
+    df = load_aggregated(csv_file, by='Month', value='Sales')
+    validate_data(df)
     return df
 
 
-def main():
-    # Load data
-    df = load_data()
-    
-    # Ensure months are in correct order
-    month_order = [
-        "Jan", "Feb", "Mar", "Apr", "May", "Jun",
-        "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
-    ]
-    df["Month"] = pd.Categorical(df["Month"], categories=month_order, ordered=True)
-    df = df.sort_values("Month")
-    
-    # Configure style based on MODE
-    if MODE == 'dark':
-        plt.style.use('dark_background')
-        bg_color = '#1e1e1e'
-        text_color = 'white'
-        grid_color = 'gray'
-        edge_color = '#555555'
-        bar_colors = sns.color_palette("bright", n_colors=len(df))
-    else:  # light mode
-        plt.style.use('default')
-        bg_color = 'white'
-        text_color = 'black'
-        grid_color = 'gray'
-        edge_color = 'gray'
-        bar_colors = sns.color_palette("pastel", n_colors=len(df))
-    
-    # Create figure with appropriate background
-    fig, ax = plt.subplots(figsize=(6, 4), facecolor=bg_color)
-    ax.set_facecolor(bg_color)
-    
-    # Plot
+def validate_data(df):
+    """Validate required columns."""
+    required_cols = ['Month', 'Sales']
+    if not all(col in df.columns for col in required_cols):
+        raise ValueError(f"CSV must contain columns: {required_cols}")
+
+
+def label_bars(ax, labels):
+    """Label as many bars as fit side by side."""
+    label_pixels = (max(map(len, labels)) * 0.6 + 0.5) * tick_label_pixels(DPI, 'x')
+    ax.set_xticks(*thin_ticks(labels, ax.get_position().width * FIGSIZE[0] * DPI, label_pixels))
+
+
+def create_chart(df, mode='light'):
+    """Create the bar chart figure."""
+    # Months in calendar order, other categories ranked by sales
+    df = order_categories(df, "Month", "Sales")
+    labels = df["Month"].astype(str).to_numpy()
+    positions = np.arange(len(df))
+
+    # Create figure
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.subplots()
+
+    # Plot bars at integer positions, so matplotlib skips its
+    # string category conversion
     ax.bar(
-        df["Month"],
-        df["Sales"],
-        color=bar_colors,
-        edgecolor=edge_color,
+        positions,
+        df["Sales"].to_numpy(),
         linewidth=0.0,
         width=0.8
     )
-    
+
+    label_bars(ax, labels)
+
     # Chart Settings
-    ax.set_title("Monthly Sales Performance", 
-                 pad=10, 
-                 fontsize=14, 
-                 fontweight='bold',
-                 color=text_color)
-    ax.set_xlabel("Month", fontweight='bold', color=text_color)
-    ax.set_ylabel("Sales", fontweight='bold', color=text_color)
-    
-    # Set tick colors
-    ax.tick_params(colors=text_color, which='both')
-    
+    ax.set_title("Monthly Sales Performance",
+                 pad=10,
+                 fontsize=14,
+                 fontweight='bold')
+    ax.set_xlabel("Month", fontweight='bold')
+    ax.set_ylabel("Sales", fontweight='bold')
+
     # Add grid
-    ax.grid(axis="y", linestyle="-", alpha=0.3, color=grid_color)
-    
-    plt.tight_layout()
+    ax.grid(axis="y", linestyle="-", alpha=0.3)
+
+    with stage("layout"):
+        fit_layout(fig, OUTPUT_NAME)
 
     # Remove outside border (spines)
     ax.spines['top'].set_visible(False)
@@ -91,14 +93,74 @@ def main():
     ax.spines['bottom'].set_visible(False)
     ax.spines['left'].set_visible(False)
 
-    # Save the figure to output folder
-    OUTPUT_FILE = Path("output") / f"barchart_{MODE}.png"
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(OUTPUT_FILE, dpi=72, bbox_inches='tight', facecolor=bg_color)
-    print(f"Chart saved to: {OUTPUT_FILE} ({MODE} mode)")
+    # Apply colors for the requested mode
+    apply_theme(fig, mode)
+
+    return fig
+
+
+def update_chart(fig, df):
+    """Show new data on a chart made by create_chart().
+
+    Only the bar heights, tick labels and value axis change. Raises
+    ValueError when the number of bars differs, as the figure then has
+    to be rebuilt.
+    """
+    df = order_categories(df, "Month", "Sales")
+    ax = fig.axes[0]
+    if len(df) != len(ax.patches):
+        raise ValueError(f"Expected {len(ax.patches)} bars, got {len(df)}")
+
+    for bar, value in zip(ax.patches, df["Sales"].to_numpy()):
+        bar.set_height(value)
+    label_bars(ax, df["Month"].astype(str).to_numpy())
+
+    # Limits from the bars only
+    ax.relim()
+    ax.autoscale_view()
+
+
+def apply_theme(fig, mode='light'):
+    """Restyle an existing chart for the given mode."""
+    theme = get_theme(mode)
+
+    ax = fig.axes[0]
+    fig.set_facecolor(theme.bg)
+    ax.set_facecolor(theme.bg)
+
+    # Recolor bars
+    bar_colors = theme.colors(len(ax.patches))
+    for bar, color in zip(ax.patches, bar_colors):
+        bar.set_facecolor(color)
+        bar.set_edgecolor(theme.edge)
+
+    # Title, labels, ticks and grid
+    ax.title.set_color(theme.text)
+    ax.xaxis.label.set_color(theme.text)
+    ax.yaxis.label.set_color(theme.text)
+    ax.tick_params(colors=theme.text, which='both', grid_color=theme.grid)
+
+
+def main():
+    # Load data
+    df = load_data()
+
+    # Create chart once
+    fig = create_chart(df, mode=MODE)
+
+    # Save a light and a dark copy to output folder
+    for mode in ('light', 'dark'):
+        apply_theme(fig, mode)
+        OUTPUT_FILE = Path("output") / f"{OUTPUT_NAME}_{mode}.png"
+        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        bbox = tight_bbox(fig, OUTPUT_NAME, DPI)
+        fig.savefig(OUTPUT_FILE, dpi=DPI, bbox_inches=bbox, facecolor=fig.get_facecolor())
+        print(f"Chart saved to: {OUTPUT_FILE} ({mode} mode)")
 
-    # Show chart
-    plt.show()
+    # Open a preview window only when asked to
+    if SHOW:
+        apply_theme(fig, MODE)
+        show_figure(fig)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
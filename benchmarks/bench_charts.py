@@ -0,0 +1,285 @@
+# benchmarks/bench_charts.py
+"""Time every chart across data sizes, modes, DPIs and output formats.
+
+Run from the project root:
+
+    python benchmarks/bench_charts.py                          # 10 to 100,000 rows
+    python benchmarks/bench_charts.py --sizes 10 1000 10000000 barchart map
+    python benchmarks/bench_charts.py --save-baseline          # store the results
+    python benchmarks/bench_charts.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_charts.py --sizes 10000000 --input parquet   # columnar input
+    python benchmarks/bench_charts.py linechart --sizes 10000000 --mode light --dpi 72
+
+Synthetic CSV files shaped like the ones in data/ are generated once per
+size. Charts in SERIES_CHARTS are also timed on a long series with one
+timestamp per row, where every row is its own group. For each chart,
+size, mode, DPI and format the stages are timed separately:
+
+    load   chart.load_data(): read the CSV and aggregate it
+    draw   chart.create_chart(): transform the data and build the figure
+    theme  chart.apply_theme(): restyle the figure for the mode
+    save   fig.savefig() into memory, including the tight bbox pass
+
+The layout cache is emptied before every run, so draw and save include
+measuring the text, as for new data. With --warm-layout it is kept
+between runs, and the fastest run times the cached layouts instead. It
+is kept in a temporary file, so the real one neither skews nor records
+the results.
+
+A chart that fails is recorded once and not run at its other settings.
+Peak Python memory per case is measured with tracemalloc in a second,
+untimed pass. Results are written as JSON; with --baseline, cases whose
+total time grew by more than --tolerance are reported as regressions and
+the script exits with status 1.
+"""
+
+import argparse
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import matplotlib  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import layout  # noqa: E402
+from categories import MONTHS  # noqa: E402
+from chartdata import source_file, write_columnar  # noqa: E402
+from charts import CHARTS, MODES, get_chart, use_headless  # noqa: E402
+
+DEFAULT_SIZES = [10, 1_000, 100_000]
+DPIS = [72, 150]
+FORMATS = ['png']
+INPUTS = {'csv': None, 'parquet': '.parquet', 'arrow': '.arrow'}
+RESULTS_FILE = Path("benchmarks") / "results.json"
+BASELINE_FILE = Path("benchmarks") / "baseline.json"
+TOLERANCE = 0.25       # Allowed slowdown before a case counts as a regression
+NOISE_SECONDS = 0.005  # Differences below this are ignored
+MAX_PRODUCTS = 1_000   # Distinct products in the synthetic product file
+SERIES_CHARTS = ['linechart']  # Also timed on the minute-level "time_series" file
+
+
+def make_csv(kind, rows, data_dir):
+    """Write a synthetic CSV shaped like data/<kind>.csv and return its path."""
+    csv_file = Path(data_dir) / f"{kind}_{rows}.csv"
+    if csv_file.exists():
+        return csv_file
+
+    rng = np.random.default_rng(rows)
+    if kind == "monthly_sales":
+        df = pd.DataFrame({
+            "Month": np.array(MONTHS)[rng.integers(0, len(MONTHS), rows)],
+            "Sales": rng.integers(100, 5_000, rows),
+        })
+    elif kind == "product_sales":
+        products = np.array([f"Product {i}" for i in range(min(rows, MAX_PRODUCTS))])
+        df = pd.DataFrame({
+            "Product": products[rng.integers(0, len(products), rows)],
+            "Sales": rng.integers(100, 5_000, rows),
+        })
+    elif kind == "time_series":
+        minutes = np.datetime64("2020-01-01T00:00") + np.arange(rows).astype("timedelta64[m]")
+        df = pd.DataFrame({
+            "Month": np.datetime_as_string(minutes, unit="m"),
+            "Sales": 1_000 + rng.normal(0, 5, rows).cumsum().round(2),
+        })
+    elif kind == "states":
+        states = pd.read_csv(ROOT / "data" / "states.csv", usecols=["State", "Code"])
+        picks = rng.integers(0, len(states), rows)
+        df = states.iloc[picks].assign(Population=rng.integers(1_000, 100_000, rows))
+    else:
+        raise ValueError(f"Unknown data file '{kind}'")
+
+    df.to_csv(csv_file, index=False)
+    return csv_file
+
+
+def run_case(chart, csv_file, mode, dpi, fmt, warm_layout=False):
+    """Run every stage once and return the time of each in seconds."""
+    if not warm_layout:
+        layout.clear()
+    timings = {}
+
+    start = time.perf_counter()
+    df = chart.load_data(csv_file)
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fig = chart.create_chart(df, mode=mode)
+    timings["draw"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chart.apply_theme(fig, mode)
+    timings["theme"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bbox = layout.tight_bbox(fig, chart.OUTPUT_NAME, dpi)
+    fig.savefig(io.BytesIO(), format=fmt, dpi=dpi, bbox_inches=bbox, facecolor=fig.get_facecolor())
+    timings["save"] = time.perf_counter() - start
+
+    fig.clear()
+    return timings
+
+
+def peak_memory(chart, csv_file, mode, dpi, fmt, warm_layout=False):
+    """Return the peak traced memory of one case in MB."""
+    tracemalloc.start()
+    try:
+        run_case(chart, csv_file, mode, dpi, fmt, warm_layout)
+        return tracemalloc.get_traced_memory()[1] / 1024**2
+    finally:
+        tracemalloc.stop()
+
+
+def bench_chart(name, sizes, modes, dpis, formats, data_dir, args, kind=None):
+    """Time one chart at every setting and return the results.
+
+    `kind` picks another synthetic file than the one shaped like the
+    chart's CSV. The first failure is recorded and ends the chart's run.
+    """
+    chart = get_chart(name)
+    label = f"{name}/{kind}" if kind else name
+    results = []
+    for rows in sizes:
+        csv_file = make_csv(kind or Path(chart.CSV_FILE).stem, rows, data_dir)
+        if INPUTS[args.input] and not source_file(csv_file).suffix == INPUTS[args.input]:
+            write_columnar(csv_file, INPUTS[args.input])
+        for mode in modes:
+            for dpi in dpis:
+                for fmt in formats:
+                    result = {"chart": name, "rows": rows, "mode": mode, "dpi": dpi, "format": fmt,
+                              "input": args.input}
+                    if kind:
+                        result["data"] = kind
+                    results.append(result)
+                    try:
+                        runs = [run_case(chart, csv_file, mode, dpi, fmt, args.warm_layout)
+                                for _ in range(args.repeat)]
+                        best = min(runs, key=lambda run: sum(run.values()))
+                        result.update(best, total=sum(best.values()))
+                        if not args.no_memory:
+                            result["peak_mb"] = peak_memory(chart, csv_file, mode, dpi, fmt, args.warm_layout)
+                    except Exception as e:
+                        result["error"] = f"{type(e).__name__}: {e}"
+                        print(f"{label:<23} {rows:>9} {mode:<5} {dpi:>4} {fmt:<4}  {result['error']}")
+                        return results
+
+                    memory = f"{result['peak_mb']:8.1f} MB" if "peak_mb" in result else ""
+                    print(f"{label:<23} {rows:>9} {mode:<5} {dpi:>4} {fmt:<4}  "
+                          + "  ".join(f"{stage} {result[stage] * 1000:7.1f}"
+                                      for stage in ("load", "draw", "theme", "save"))
+                          + f"  total {result['total'] * 1000:8.1f} ms {memory}")
+    return results
+
+
+def case_key(result):
+    return (result["chart"], result["rows"], result["mode"], result["dpi"], result["format"],
+            result.get("input", "csv"), result.get("data"))
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Print how each case changed against the baseline and return the regressions."""
+    previous = {case_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None or "total" not in result or "total" not in old:
+            continue
+        change = result["total"] / old["total"] - 1 if old["total"] else 0.0
+        slower = change > tolerance and result["total"] - old["total"] > NOISE_SECONDS
+        if slower:
+            regressions.append(result)
+        if slower or change < -tolerance:
+            label = "REGRESSION" if slower else "faster"
+            print(f"{label:>10}  {'/'.join(str(part) for part in case_key(result) if part is not None)}: "
+                  f"{old['total'] * 1000:.1f} -> {result['total'] * 1000:.1f} ms ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("charts", nargs="*", metavar="chart",
+                        help=f"charts to benchmark (default: all). Options: {CHARTS}")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"rows in the synthetic CSV files (default: {DEFAULT_SIZES})")
+    parser.add_argument("--mode", choices=MODES, action="append", help="modes (default: both)")
+    parser.add_argument("--dpi", type=int, action="append", help=f"DPIs (default: {DPIS})")
+    parser.add_argument("--format", action="append", help=f"output formats (default: {FORMATS})")
+    parser.add_argument("--input", choices=INPUTS, default='csv',
+                        help="read the data from CSV, or from a Parquet or Arrow copy (default: csv)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per case, the fastest is kept (default: 3)")
+    parser.add_argument("--warm-layout", action="store_true",
+                        help="keep cached layouts between runs instead of measuring them every time")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--data-dir", help="folder for the synthetic CSV files (default: a temporary folder)")
+    parser.add_argument("--output", default=RESULTS_FILE, type=Path,
+                        help=f"JSON results file (default: {RESULTS_FILE})")
+    parser.add_argument("--baseline", type=Path, help="JSON results to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help=f"also write the results to {BASELINE_FILE}")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"allowed slowdown as a fraction (default: {TOLERANCE})")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.charts if name not in CHARTS]
+    if unknown:
+        parser.error(f"unknown charts: {unknown}")
+
+    use_headless()
+    names = args.charts or CHARTS
+    modes = args.mode or MODES
+    dpis = args.dpi or DPIS
+    formats = args.format or FORMATS
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # One folder per input, so a CSV run never picks up a columnar copy
+        data_dir = Path(args.data_dir or tmp_dir) / args.input
+        data_dir.mkdir(parents=True, exist_ok=True)
+        layout.use_file(Path(tmp_dir) / "layouts.json")
+
+        for name in names:
+            results += bench_chart(name, args.sizes, modes, dpis, formats, data_dir, args)
+            if name in SERIES_CHARTS:
+                results += bench_chart(name, args.sizes, modes, dpis, formats, data_dir, args, "time_series")
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "matplotlib": matplotlib.__version__,
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "repeat": args.repeat,
+            "warm_layout": args.warm_layout,
+        },
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to: {args.output}")
+    if args.save_baseline:
+        BASELINE_FILE.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to: {BASELINE_FILE}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
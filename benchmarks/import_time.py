@@ -0,0 +1,97 @@
+# benchmarks/import_time.py
+"""Check how long each chart module takes to import, and what it pulls in.
+
+Run from the project root:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py barchart --max-ms 1500
+
+Each module is imported in a fresh interpreter with `python -X importtime`.
+The check fails if a chart imports a heavy library it does not need
+(seaborn anywhere, geopandas and its GIS stack outside the map) or, with
+--max-ms, if an import takes longer than the limit.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from charts import CHARTS  # noqa: E402
+
+MODULES = [*CHARTS, "charts", "render_all", "server"]
+
+# Packages a module must not import, unless it is listed as needing them
+HEAVY = {
+    "seaborn": (),
+    "geopandas": ("map",),
+    "shapely": ("map",),
+    "pyproj": ("map",),
+    "pyogrio": ("map",),
+}
+
+
+def import_profile(module):
+    """Import a module in a new interpreter.
+
+    Returns the wall time in seconds, the cumulative import time of the
+    module in seconds, and the set of top-level packages imported.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+
+    cumulative = 0.0
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if not total.strip().isdigit():
+            continue  # Header line
+        packages.add(name.strip().split(".")[0])
+        if name.strip() == module:
+            cumulative = int(total) / 1e6
+    return wall, cumulative, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", metavar="module",
+                        help=f"modules to import (default: {MODULES})")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="imports per module, the fastest is reported (default: 3)")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="fail if a module's import time exceeds this")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<18} {'import ms':>10} {'process ms':>11}  heavy packages")
+    for module in args.modules or MODULES:
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        wall = min(run[0] for run in runs)
+        cumulative = min(run[1] for run in runs)
+        packages = runs[0][2]
+
+        heavy = sorted(name for name in HEAVY if name in packages)
+        print(f"{module:<18} {cumulative * 1000:>10.0f} {wall * 1000:>11.0f}  {', '.join(heavy) or '-'}")
+
+        unexpected = [name for name in heavy if module not in HEAVY[name]]
+        if unexpected:
+            failures.append(f"{module} imports {', '.join(unexpected)}")
+        if args.max_ms is not None and cumulative * 1000 > args.max_ms:
+            failures.append(f"{module} took {cumulative * 1000:.0f} ms to import (limit {args.max_ms:g} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
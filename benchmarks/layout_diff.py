@@ -0,0 +1,98 @@
+# benchmarks/layout_diff.py
+"""Check that cached layouts render the same pixels as tight_layout().
+
+Run from the project root:
+
+    python benchmarks/layout_diff.py
+    python benchmarks/layout_diff.py barchart --max-diff 0.01
+
+Every chart is rendered in each mode three times: measured from scratch
+(layout.FIXED_LAYOUT off), with an empty layout cache and with the cache
+filled by the previous pass. The cached images must have the same size
+as the measured ones and differ by at most --max-diff per channel (0-1).
+The layout cache is kept in a temporary folder so the real one is not
+touched.
+"""
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import matplotlib.image as mpimg  # noqa: E402
+import numpy as np  # noqa: E402
+
+import layout  # noqa: E402
+from charts import (CHARTS, MODES, data_key, get_chart, load_shared_data, render_bytes,  # noqa: E402
+                    use_headless)
+
+MAX_DIFF = 0.0  # Largest allowed per-channel difference, 0-1
+REPEAT = 3      # Timed renders per case, the fastest is reported
+
+
+def render(name, df, mode, repeat=1):
+    """Render a chart to PNG and return its pixels and the fastest time taken."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        image = render_bytes(name, df, mode, 'png')
+        seconds.append(time.perf_counter() - start)
+    return mpimg.imread(io.BytesIO(image), format='png'), min(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("charts", nargs="*", metavar="chart",
+                        help=f"charts to check (default: all). Options: {CHARTS}")
+    parser.add_argument("--max-diff", type=float, default=MAX_DIFF,
+                        help=f"largest allowed per-channel difference, 0-1 (default: {MAX_DIFF})")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.charts if name not in CHARTS]
+    if unknown:
+        parser.error(f"unknown charts: {unknown}")
+
+    use_headless()
+    names = args.charts or CHARTS
+    frames = load_shared_data(names)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        layout.use_file(Path(tmp_dir) / "layouts.json")
+        for name in names:
+            df = frames[data_key(get_chart(name))]
+            for mode in MODES:
+                layout.FIXED_LAYOUT = False
+                expected, exact_seconds = render(name, df, mode, REPEAT)
+
+                layout.FIXED_LAYOUT = True
+                layout.clear()
+                results = {"cold": render(name, df, mode), "warm": render(name, df, mode, REPEAT)}
+
+                for cache, (actual, seconds) in results.items():
+                    if actual.shape != expected.shape:
+                        failures.append(f"{name} {mode} {cache}: size {actual.shape[:2]}, expected {expected.shape[:2]}")
+                        continue
+                    diff = float(np.abs(actual - expected).max())
+                    if diff > args.max_diff:
+                        failures.append(f"{name} {mode} {cache}: differs by {diff:.3f}")
+
+                warm_seconds = results["warm"][1]
+                print(f"{name:<17} {mode:<5} measured {exact_seconds * 1000:7.1f} ms  "
+                      f"cached {warm_seconds * 1000:7.1f} ms ({warm_seconds / exact_seconds - 1:+.0%})")
+
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    if failures:
+        sys.exit(1)
+    print("Cached layouts match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/load_test.py
+"""Measure latency and throughput of the chart server.
+
+Start the server, then run the load generator against it:
+
+    python server.py --workers 4
+    python benchmarks/load_test.py --requests 2000 --concurrency 32
+
+Requests cycle through the given charts and both modes, so many of them
+are identical and can be coalesced by the server.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from charts import CHARTS, MODES  # noqa: E402
+
+
+async def request(reader, writer, host, path):
+    """Send one keep-alive GET request and return (status, body)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        key, _, value = line.decode().partition(":")
+        headers[key.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, body
+
+
+async def client(host, port, paths, results):
+    """Issue requests over one connection until the shared path iterator is exhausted."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, path)
+            results.append((status, time.perf_counter() - start))
+    finally:
+        writer.close()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(args):
+    names = args.charts or [name for name in CHARTS if name != "map"]
+    jobs = itertools.cycle([f"/charts/{name}.{args.format}?mode={mode}"
+                            for name in names for mode in MODES])
+    paths = itertools.islice(jobs, args.requests)  # Shared by every client
+
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, paths, results)
+                           for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, body = await request(reader, writer, args.host, "/stats")
+    writer.close()
+    stats = json.loads(body)
+
+    latencies = [seconds * 1000 for status, seconds in results if status == 200]
+    statuses = {status: sum(1 for s, _ in results if s == status) for status, _ in results}
+    print(f"{len(results)} requests in {elapsed:.2f}s ({len(results) / elapsed:.1f} req/s), "
+          f"concurrency {args.concurrency}")
+    print(f"status counts: {dict(sorted(statuses.items()))}")
+    if latencies:
+        print(f"latency ms: mean {statistics.mean(latencies):.1f}  p50 {percentile(latencies, 50):.1f}  "
+              f"p95 {percentile(latencies, 95):.1f}  p99 {percentile(latencies, 99):.1f}  "
+              f"max {max(latencies):.1f}")
+    print(f"server: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("charts", nargs="*", metavar="chart",
+                        help="charts to request (default: all but the map)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--requests", type=int, default=1000, help="total requests (default: 1000)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="open connections (default: 16)")
+    parser.add_argument("--format", default="png", help="image format (default: png)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.charts if name not in CHARTS]
+    if unknown:
+        parser.error(f"unknown charts: {unknown}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/stress_render.py
+"""Render charts in a loop and check that memory stays flat.
+
+Run from the project root:
+
+    python benchmarks/stress_render.py --renders 10000
+    python benchmarks/stress_render.py barchart piechart --renders 2000
+    python benchmarks/stress_render.py linechart --template
+
+With --template every (chart, mode) pair keeps one ChartTemplate and each
+render shows slightly changed data on it, like a dashboard refreshing.
+"""
+
+import argparse
+import itertools
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+
+from charts import (CHARTS, MODES, ChartTemplate, data_key, get_chart, load_shared_data,  # noqa: E402
+                    render_chart, use_headless)
+
+WARMUP_RENDERS = 100  # Caches and font tables fill up during these
+
+
+def rss_mb():
+    """Return the resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Not Linux: fall back to the peak RSS, which still shows growth
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("charts", nargs="*", metavar="chart",
+                        help=f"charts to cycle through (default: all). Options: {CHARTS}")
+    parser.add_argument("--renders", type=int, default=10_000,
+                        help="number of (chart, mode) renders (default: 10000)")
+    parser.add_argument("--report-every", type=int, default=1000,
+                        help="print memory use every N renders (default: 1000)")
+    parser.add_argument("--max-growth-mb", type=float, default=20.0,
+                        help="fail if RSS grows more than this after warm-up (default: 20)")
+    parser.add_argument("--template", action="store_true",
+                        help="update one ChartTemplate per chart and mode with new data")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.charts if name not in CHARTS]
+    if unknown:
+        parser.error(f"unknown charts: {unknown}")
+    names = args.charts or CHARTS
+
+    use_headless()
+    frames = load_shared_data(names)
+    jobs = itertools.cycle([(name, mode) for name in names for mode in MODES])
+    templates = {(name, mode): ChartTemplate(name, mode) for name in names for mode in MODES}
+    rng = np.random.default_rng(0)
+
+    baseline = None
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as output_dir:
+        for i in range(1, args.renders + 1):
+            name, mode = next(jobs)
+            if args.template:
+                # Scale every numeric column by up to 10% to simulate fresh data
+                df = frames[data_key(get_chart(name))]
+                numeric = df.select_dtypes('number')
+                templates[name, mode].render(df.assign(**numeric.mul(rng.uniform(0.9, 1.1, len(df)), axis=0)))
+            else:
+                render_chart(name, frames, (mode,), output_dir)
+
+            if i == min(WARMUP_RENDERS, args.renders):
+                baseline = rss_mb()
+                print(f"{i:>7} renders  RSS {baseline:8.1f} MB  (baseline)")
+            elif i % args.report_every == 0:
+                print(f"{i:>7} renders  RSS {rss_mb():8.1f} MB")
+
+    elapsed = time.perf_counter() - start
+    growth = rss_mb() - baseline
+    print(f"{args.renders} renders in {elapsed:.1f}s "
+          f"({elapsed / args.renders * 1000:.1f} ms each), RSS growth {growth:+.1f} MB")
+
+    if growth > args.max_growth_mb:
+        print(f"FAIL: RSS grew by more than {args.max_growth_mb} MB")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# categories.py
+"""Helpers for bar charts with one bar per category."""
+
+import numpy as np
+import pandas as pd
+from matplotlib import rcParams
+from matplotlib.font_manager import FontProperties
+
+MONTHS = [
+    "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+    "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
+]
+
+
+def order_categories(df, column, value):
+    """Sort rows for plotting.
+
+    Months are put in calendar order; any other categories are ranked by
+    `value`, largest first.
+    """
+    month_index = pd.Index(MONTHS).get_indexer(df[column])
+    if (month_index >= 0).all():
+        order = np.argsort(month_index, kind='stable')
+    else:
+        order = np.argsort(-df[value].to_numpy(), kind='stable')
+    return df.iloc[order]
+
+
+def tick_label_pixels(dpi, axis='x'):
+    """Return the rendered height of one tick label in pixels."""
+    size = FontProperties(size=rcParams[f'{axis}tick.labelsize']).get_size_in_points()
+    return size * dpi / 72
+
+
+def thin_ticks(labels, axis_pixels, label_pixels):
+    """Pick evenly spaced tick positions whose labels fit along an axis.
+
+    `label_pixels` is the room one label needs along the axis. Returns the
+    positions and their labels; every category is labelled when they fit.
+    """
+    fit = max(1, int(axis_pixels // label_pixels))
+    positions = np.arange(0, len(labels), -(-len(labels) // fit))
+    return positions, np.asarray(labels)[positions]
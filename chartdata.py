@@ -0,0 +1,252 @@
+# chartdata.py
+"""Data loading helpers shared by the chart scripts."""
+
+from pathlib import Path
+
+import pandas as pd
+
+from instrument import stage
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Fall back to pandas' C parser; columnar files are ignored
+    pa = None
+
+CHUNK_ROWS = 1_000_000     # Rows per chunk for the pandas and Parquet readers
+BLOCK_BYTES = 4 * 1024**2     # Bytes per batch for the pyarrow reader
+TOP_N = 10                 # Groups kept by top_n() before the rest become OTHER
+OTHER = 'Other'            # Group holding everything top_n() does not keep
+
+# Columnar copies of a CSV file, read instead of it when present and up to date
+COLUMNAR_SUFFIXES = ('.arrow', '.parquet')
+
+_warned_stale = set()  # Out-of-date columnar files already reported by source_file()
+
+
+def source_file(csv_file):
+    """Return the file load_aggregated() and load_columns() read for a CSV path.
+
+    An Arrow IPC (.arrow) or Parquet (.parquet) file next to the CSV, with
+    the same name, is used instead when pyarrow is installed and the file
+    is at least as new as the CSV. An older copy is ignored, with a
+    warning the first time it is seen.
+    """
+    csv_file = Path(csv_file)
+    if pa is None:
+        return csv_file
+    for suffix in COLUMNAR_SUFFIXES:
+        columnar_file = csv_file.with_suffix(suffix)
+        if not columnar_file.exists():
+            continue
+        if csv_file.exists() and columnar_file.stat().st_mtime_ns < csv_file.stat().st_mtime_ns:
+            if columnar_file not in _warned_stale:
+                _warned_stale.add(columnar_file)
+                print(f"Warning: ignoring {columnar_file}, which is older than {csv_file}")
+            continue
+        return columnar_file
+    return csv_file
+
+
+def load_aggregated(csv_file, by, value='Sales'):
+    """Stream a CSV file and sum `value` per group with bounded memory.
+
+    Only the `by` and `value` columns are parsed. The file is read in
+    batches and each batch is reduced to per-group totals as it is read,
+    so memory depends on the number of groups, not on the number of rows.
+    Groups keep the order in which they first appear.
+    A columnar copy of the file is read instead when there is one; see
+    source_file().
+
+    Returns a small dataframe with the `by` columns and `value`. Group
+    columns keep the type read_csv() would give them, so numeric keys stay
+    numeric.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    data_file = source_file(csv_file)
+    columnar = data_file.suffix in COLUMNAR_SUFFIXES
+
+    # Check the header before streaming the file
+    columns = _schema(data_file).names if columnar else pd.read_csv(data_file, nrows=0).columns
+    required_cols = by + [value]
+    if not all(col in columns for col in required_cols):
+        raise ValueError(f"CSV must contain columns: {required_cols}")
+
+    # Batch totals wait until they add up to as many rows as the running
+    # totals (and at least CHUNK_ROWS) before they are merged into them.
+    # Memory stays bounded by the number of groups, and when nearly every
+    # row is its own group, as in a long time series, each row is
+    # re-grouped a few times rather than once per batch
+    totals, pending, pending_rows = None, [], 0
+    with stage("read"):
+        chunks = _read_columnar(data_file, by, value) if columnar else _read_chunks(data_file, by, value)
+        for chunk in chunks:
+            partial = chunk.groupby(by, sort=False)[value].sum()
+            pending.append(partial)
+            pending_rows += len(partial)
+            if pending_rows >= max(CHUNK_ROWS, 0 if totals is None else len(totals)):
+                totals = _combine(totals, pending, by)
+                pending, pending_rows = [], 0
+        if pending:
+            totals = _combine(totals, pending, by)
+
+    if totals is None:
+        return pd.DataFrame(columns=required_cols)
+    return _restore_types(totals.reset_index(), by)
+
+
+def _combine(totals, partials, by):
+    """Add batch totals to the running totals, keeping groups in order of first appearance."""
+    frames = partials if totals is None else [totals, *partials]
+    return pd.concat(frames).groupby(level=by, sort=False).sum()
+
+
+def load_columns(csv_file, columns):
+    """Read `columns` of every row, for charts that plot each row rather than totals.
+
+    Reads the columnar copy of the file when there is one, like
+    load_aggregated(). Columns keep the types read_csv() would give them.
+    """
+    data_file = source_file(csv_file)
+    columnar = data_file.suffix in COLUMNAR_SUFFIXES
+
+    # Check the header before reading the file
+    names = _schema(data_file).names if columnar else pd.read_csv(data_file, nrows=0).columns
+    if not all(col in names for col in columns):
+        raise ValueError(f"CSV must contain columns: {columns}")
+
+    with stage("read"):
+        if not columnar:
+            return pd.read_csv(data_file, usecols=columns)[columns]
+        if data_file.suffix == '.parquet':
+            table = pq.read_table(data_file, columns=columns, memory_map=True)
+        else:
+            table = pa_ipc.open_file(pa.memory_map(str(data_file))).read_all().select(columns)
+        return _restore_types(table.to_pandas(), columns)
+
+
+def _restore_types(df, columns):
+    """Give columns read as text, categories or float64 the type read_csv() would infer."""
+    for col in columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (TypeError, ValueError):
+                df[col] = df[col].astype('str')  # Text keys, as before
+        # Columnar copies store every number as float64
+        if pd.api.types.is_float_dtype(df[col]) and (df[col] % 1 == 0).all():
+            df[col] = df[col].astype('int64')
+    return df
+
+
+def _read_chunks(csv_file, by, value):
+    """Yield dataframes holding only the `by` and `value` columns."""
+    if pa is not None:
+        reader = pa_csv.open_csv(
+            csv_file,
+            read_options=pa_csv.ReadOptions(block_size=BLOCK_BYTES),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=by + [value],
+                column_types={**{col: pa.string() for col in by}, value: pa.float64()},
+            ),
+        )
+        for batch in reader:
+            yield batch.to_pandas()
+    else:
+        dtype = {**{col: 'str' for col in by}, value: 'float64'}
+        yield from pd.read_csv(csv_file, usecols=by + [value], dtype=dtype, chunksize=CHUNK_ROWS)
+
+
+def _schema(path):
+    """Return the schema of an Arrow IPC or Parquet file without reading its data."""
+    if path.suffix == '.parquet':
+        return pq.read_schema(path, memory_map=True)
+    return pa_ipc.open_file(pa.memory_map(str(path))).schema
+
+
+def _read_columnar(path, by, value):
+    """Yield dataframes from a memory-mapped Arrow IPC or Parquet file.
+
+    Only the `by` and `value` columns are read. Group columns arrive as
+    categoricals, which group much faster than strings, and the value
+    column as float64. Arrow IPC batches are views of the mapped file, so
+    numeric columns reach pandas without being copied.
+    """
+    columns = by + [value]
+    if path.suffix == '.parquet':
+        batches = pq.ParquetFile(path, memory_map=True, read_dictionary=by).iter_batches(
+            batch_size=CHUNK_ROWS, columns=columns)
+    else:
+        reader = pa_ipc.open_file(pa.memory_map(str(path)))
+        batches = (reader.get_batch(i).select(columns) for i in range(reader.num_record_batches))
+
+    for batch in batches:
+        arrays = [batch.column(col) for col in by]
+        arrays = [a if pa.types.is_dictionary(a.type) else a.dictionary_encode() for a in arrays]
+        arrays.append(batch.column(value).cast(pa.float64()))
+        yield pa.RecordBatch.from_arrays(arrays, names=columns).to_pandas(split_blocks=True)
+
+
+def write_columnar(csv_file, suffix='.parquet'):
+    """Write an Arrow IPC or Parquet copy of a CSV file next to it and return its path.
+
+    The CSV is streamed, so files larger than memory can be converted.
+    Column types are fixed from the first block before streaming: numeric
+    columns are stored as float64, so a decimal further down does not
+    break an integer column, and everything else as text.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is needed to write columnar files")
+    if suffix not in COLUMNAR_SUFFIXES:
+        raise ValueError(f"Unknown columnar format '{suffix}'. Options: {list(COLUMNAR_SUFFIXES)}")
+
+    csv_file = Path(csv_file)
+    output_file = csv_file.with_suffix(suffix)
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    read_options = pa_csv.ReadOptions(block_size=BLOCK_BYTES)
+    column_types = {
+        field.name: pa.float64() if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+        else pa.string()
+        for field in pa_csv.open_csv(csv_file, read_options=read_options).schema
+    }
+    reader = pa_csv.open_csv(csv_file, read_options=read_options,
+                             convert_options=pa_csv.ConvertOptions(column_types=column_types))
+    try:
+        if suffix == '.parquet':
+            writer = pq.ParquetWriter(tmp_file, reader.schema)
+        else:
+            writer = pa_ipc.new_file(tmp_file, reader.schema)
+        with writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        tmp_file.replace(output_file)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)  # Never leave half a copy behind
+        raise
+    return output_file
+
+
+def top_n(df, by, value='Sales', n=TOP_N, other=OTHER):
+    """Sum `value` per group, keep the `n` largest and fold the rest into `other`.
+
+    Groups with a negative total are dropped in the same pass, since they
+    cannot be shown as a share. Kept groups stay in the order they first
+    appear, with `other` last. Returns the new dataframe and the number of
+    negative groups that were dropped.
+    """
+    totals = df.groupby(by, sort=False)[value].sum()
+    negative = totals < 0
+    totals = totals[~negative]
+
+    if len(totals) > n:
+        keep = totals.index.isin(totals.nlargest(n).index)
+        rest = totals[~keep].sum()
+        totals = totals[keep]
+        if rest > 0:
+            totals.loc[other] = totals.get(other, 0) + rest
+
+    return totals.rename_axis(by).reset_index(), int(negative.sum())
@@ -0,0 +1,247 @@
+# charts.py
+"""Chart registry shared by the batch renderer."""
+
+import importlib
+import inspect
+import io
+import sys
+from pathlib import Path
+
+import instrument
+from layout import tight_bbox
+
+OUTPUT_DIR = Path("output")
+PROJECT_DIR = Path(__file__).resolve().parent
+MODES = ('light', 'dark')
+
+# Image formats render_bytes() can encode, with their HTTP content types
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'webp': 'image/webp',
+}
+
+# Each chart module provides CSV_FILE, DATA_KEY, OUTPUT_NAME, DPI, FIGSIZE,
+# load_data(), validate_data(), create_chart(df, mode) and apply_theme(fig, mode). Charts
+# that can swap their data in place also provide update_chart(fig, df).
+CHARTS = [
+    "barchart",
+    "hbarchart",
+    "piechart",
+    "donutchart",
+    "linechart",
+    "scatterplotchart",
+    "gaugechart",
+    "map",
+]
+
+
+def get_chart(name):
+    """Import and return the module for a chart."""
+    if name not in CHARTS:
+        raise ValueError(f"Unknown chart '{name}'. Options: {CHARTS}")
+    return importlib.import_module(name)
+
+
+def chart_inputs(chart):
+    """Return the files a chart's output depends on: its CSV and its code.
+
+    The code is the chart script and every project module it imports,
+    directly or through another one, such as themes.py and layout.py. A
+    columnar copy of the CSV that is read instead of it is included too.
+    """
+    from chartdata import source_file
+
+    modules = {}
+    for module in (chart, sys.modules[__name__]):  # Images are saved through this module
+        project_modules(module, modules)
+    inputs = [chart.CSV_FILE, *modules]
+    data_file = source_file(chart.CSV_FILE)
+    if data_file != Path(chart.CSV_FILE):
+        inputs.insert(1, data_file)
+    return inputs
+
+
+def project_modules(module, found=None):
+    """Return the files of `module` and the project modules it imports.
+
+    Files already in `found` are skipped, and new ones are added to it.
+    """
+    found = {} if found is None else found
+    found[Path(module.__file__)] = module
+    for value in vars(module).values():
+        imported = value if inspect.ismodule(value) else sys.modules.get(getattr(value, '__module__', None))
+        path = getattr(imported, '__file__', None)
+        if path and Path(path).resolve().parent == PROJECT_DIR and Path(path) not in found:
+            project_modules(imported, found)
+    return list(found)
+
+
+def use_headless():
+    """Select the non-interactive Agg backend so nothing waits on a window."""
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def show_figure(fig):
+    """Open a preview window for a figure made without pyplot."""
+    import matplotlib.pyplot as plt
+
+    plt.figure(fig)  # Let pyplot manage the figure so it can be shown
+    plt.show()
+    plt.close(fig)
+
+
+def data_key(chart):
+    """Return the key of a chart's loaded frame: its CSV file and how it is loaded.
+
+    A CSV file read row by row and the same file summed per month are
+    different frames, so charts only share one when both parts match.
+    """
+    return (chart.CSV_FILE, chart.DATA_KEY)
+
+
+def load_shared_data(names=CHARTS):
+    """Load every frame needed by the given charts exactly once.
+
+    Returns a dict mapping each data_key() to its dataframe. Charts that
+    share a key only validate the frame that was already loaded.
+    """
+    frames = {}
+    for name in names:
+        chart = get_chart(name)
+        key = data_key(chart)
+        if key in frames:
+            chart.validate_data(frames[key])
+        else:
+            with instrument.render(name), instrument.stage("load"):
+                frames[key] = chart.load_data()
+    return frames
+
+
+def save_chart(chart, fig, mode, output_dir=OUTPUT_DIR):
+    """Save a chart figure to the output folder and return its path."""
+    output_file = Path(output_dir) / f"{chart.OUTPUT_NAME}_{mode}.png"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with instrument.stage("save"):
+        bbox = tight_bbox(fig, chart.OUTPUT_NAME, chart.DPI)
+        fig.savefig(output_file, dpi=chart.DPI, bbox_inches=bbox, facecolor=fig.get_facecolor())
+    return output_file
+
+
+def figure_bytes(chart, fig, fmt='png'):
+    """Encode a chart figure in memory and return the image bytes."""
+    buffer = io.BytesIO()
+    with instrument.stage("save"):
+        bbox = tight_bbox(fig, chart.OUTPUT_NAME, chart.DPI)
+        fig.savefig(buffer, format=fmt, dpi=chart.DPI, bbox_inches=bbox, facecolor=fig.get_facecolor())
+    return buffer.getvalue()
+
+
+def render_bytes(name, df, mode='light', fmt='png'):
+    """Render a chart from a dataframe and return the encoded image.
+
+    Nothing is read from or written to disk, so this can back an HTTP
+    endpoint directly. `fmt` is one of CONTENT_TYPES.
+    """
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Unknown format '{fmt}'. Options: {list(CONTENT_TYPES)}")
+
+    chart = get_chart(name)
+    chart.validate_data(df)
+    if df.empty:
+        raise ValueError(f"{name}: No data to display")
+
+    with instrument.render(name, mode, fmt):
+        with instrument.stage("draw"):
+            fig = chart.create_chart(df, mode=mode)
+        try:
+            return figure_bytes(chart, fig, fmt)
+        finally:
+            fig.clear()
+
+
+def render_chart(name, frames, modes=MODES, output_dir=OUTPUT_DIR):
+    """Render one chart in each mode and return the saved paths.
+
+    Charts build plain Figure objects that pyplot never tracks, so nothing
+    is kept alive once the images are written.
+    """
+    chart = get_chart(name)
+    df = frames[data_key(chart)]
+
+    # Handle edge cases
+    if df.empty:
+        print(f"{name}: No data to display")
+        return []
+
+    # Build the figure once and restyle it for each mode; the first
+    # mode's metrics include the draw
+    fig = None
+    saved = []
+    try:
+        for mode in modes:
+            with instrument.render(name, mode, 'png'):
+                if fig is None:
+                    with instrument.stage("draw"):
+                        fig = chart.create_chart(df, mode=mode)
+                with instrument.stage("theme"):
+                    chart.apply_theme(fig, mode)
+                saved.append(save_chart(chart, fig, mode, output_dir))
+    finally:
+        if fig is not None:
+            fig.clear()  # Drop the artists now rather than at the next gc pass
+    return saved
+
+
+class ChartTemplate:
+    """A styled chart figure kept alive and reused for new data.
+
+    The figure, titles, grid, layout and colors are built by the first
+    render. Later renders pass the new data to the chart's update_chart(),
+    which only swaps the plotted values, so each frame costs little more
+    than the raster and encode. Charts without update_chart(), or data
+    that no longer fits the figure (a different number of bars, say), get
+    a new figure instead.
+    """
+
+    def __init__(self, name, mode='light'):
+        self.name = name
+        self.mode = mode
+        self.chart = get_chart(name)
+        self.fig = None
+        self.stats = {"updates": 0, "rebuilds": 0}
+
+    def update(self, df):
+        """Show new data on the figure, building it when needed, and return it."""
+        self.chart.validate_data(df)
+        if df.empty:
+            raise ValueError(f"{self.name}: No data to display")
+
+        if self.fig is not None and hasattr(self.chart, 'update_chart'):
+            try:
+                with instrument.stage("update"):
+                    self.chart.update_chart(self.fig, df)
+                self.stats["updates"] += 1
+                return self.fig
+            except ValueError:
+                pass  # The data does not fit this figure; build a new one
+
+        self.close()
+        with instrument.stage("draw"):
+            self.fig = self.chart.create_chart(df, mode=self.mode)
+        self.stats["rebuilds"] += 1
+        return self.fig
+
+    def render(self, df, fmt='png'):
+        """Show new data and return the encoded image, like render_bytes()."""
+        if fmt not in CONTENT_TYPES:
+            raise ValueError(f"Unknown format '{fmt}'. Options: {list(CONTENT_TYPES)}")
+        with instrument.render(self.name, self.mode, fmt):
+            return figure_bytes(self.chart, self.update(df), fmt)
+
+    def close(self):
+        """Drop the figure."""
+        if self.fig is not None:
+            self.fig.clear()
+            self.fig = None
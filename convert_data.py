@@ -0,0 +1,41 @@
+# convert_data.py
+"""Write Parquet or Arrow copies of the chart CSV files for faster loading.
+
+    python convert_data.py                      # every chart's CSV, as Parquet
+    python convert_data.py data/states.csv --format arrow
+
+The charts read a copy instead of its CSV while the copy is at least as
+new as the CSV. Parquet files are small and compressed; Arrow files are
+larger but are memory-mapped and read without decoding.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from chartdata import write_columnar
+from charts import CHARTS, get_chart
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv_files", nargs="*", type=Path, metavar="csv_file",
+                        help="CSV files to convert (default: every chart's CSV file)")
+    parser.add_argument("--format", choices=FORMATS, default='parquet',
+                        help="columnar format to write (default: parquet)")
+    args = parser.parse_args()
+
+    csv_files = args.csv_files or list(dict.fromkeys(get_chart(name).CSV_FILE for name in CHARTS))
+    for csv_file in csv_files:
+        if not csv_file.exists():
+            raise FileNotFoundError(f"{csv_file} not found")
+        start = time.perf_counter()
+        output_file = write_columnar(csv_file, FORMATS[args.format])
+        print(f"Data saved to: {output_file} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,149 +1,306 @@
 # gaugechart.py
 """Gauge Chart."""
 
-import pandas as pd
-import matplotlib.pyplot as plt
+import functools
+from matplotlib.figure import Figure
 import matplotlib.patches as patches
+from matplotlib.collections import PolyCollection
 import numpy as np
 from pathlib import Path
 
+from chartdata import load_aggregated
+from charts import show_figure
+from instrument import stage
+from layout import fit_layout, tight_bbox
+from themes import get_theme
+
 # ============================================
 # CONFIGURATION - Change mode here
 # ============================================
 MODE = 'light'  # Options: 'dark' or 'light'
+SHOW = False    # Open a preview window after saving
 # ============================================
 
+CSV_FILE = Path("data") / "monthly_sales.csv"
+DATA_KEY = 'totals by Month'  # Charts with the same CSV_FILE and DATA_KEY share one loaded frame
+OUTPUT_NAME = "gaugechart"
+DPI = 150
+FIGSIZE = (4, 3)
+
 
-def load_data():
+def load_data(csv_file=CSV_FILE):
     """Load data from CSV file."""
-    CSV_FILE = Path("data") / "monthly_sales.csv"
-    
     # Check if file exists
-    if not CSV_FILE.exists():
-        raise FileNotFoundError(f"{CSV_FILE} not found")
+    if not csv_file.exists():
+        raise FileNotFoundError(f"{csv_file} not found")
     
-    # Load and return the dataframe
-    df = pd.read_csv(CSV_FILE)
+    # Stream the file, summing Sales per Month
+    df = load_aggregated(csv_file, by='Month', value='Sales')
+    validate_data(df)
     return df
 
 
+def validate_data(df):
+    """Validate required columns."""
+    required_cols = ['Month', 'Sales']
+    if not all(col in df.columns for col in required_cols):
+        raise ValueError(f"CSV must contain columns: {required_cols}")
+
+
+# Gauge geometry
+OUTER_RADIUS = 1.0
+INNER_RADIUS = 0.7
+ARC_POINTS = 100
+SCALE_VALUES = np.array([0, 20, 40, 60, 80, 100])
+SCALE_RADIUS = OUTER_RADIUS + 0.10  # Scale text sits outside the gauge
+VALUE_TEXT_Y = 0.2  # Center value sits just above the gauge center
+
+
+@functools.lru_cache(maxsize=None)
+def _unit_arc(n_points=ARC_POINTS):
+    """Return the cached arc template: positions 0..1 along the arc."""
+    t = np.linspace(0.0, 1.0, n_points)
+    t.flags.writeable = False
+    return t
+
+
+def gauge_arc_vertices(fractions, outer_radius=OUTER_RADIUS,
+                       inner_radius=INNER_RADIUS, n_points=ARC_POINTS):
+    """Build arc polygons for an array of filled fractions.
+
+    Each arc starts at 180 degrees and sweeps clockwise by fraction * 180
+    degrees. Returns an (M, 2 * n_points, 2) array: the outer edge
+    followed by the inner edge in reverse, ready for patches.Polygon.
+    """
+    fractions = np.atleast_1d(np.asarray(fractions, dtype=float))
+    theta = np.pi - np.pi * fractions[:, None] * _unit_arc(n_points)
+    cos, sin = np.cos(theta), np.sin(theta)
+
+    vertices = np.empty((len(fractions), 2 * n_points, 2))
+    vertices[:, :n_points, 0] = outer_radius * cos
+    vertices[:, :n_points, 1] = outer_radius * sin
+    vertices[:, n_points:, 0] = inner_radius * cos[:, ::-1]
+    vertices[:, n_points:, 1] = inner_radius * sin[:, ::-1]
+    return vertices
+
+
+@functools.lru_cache(maxsize=None)
+def _background_arc(n_points=ARC_POINTS):
+    """Return the cached vertices of the full background arc."""
+    vertices = gauge_arc_vertices(1.0, n_points=n_points)[0]
+    vertices.flags.writeable = False
+    return vertices
+
+
+# Gauge grid layout, in data units per cell
+GRID_CELL_WIDTH = 2.4
+GRID_CELL_HEIGHT = 1.8
+GRID_CELL_INCHES = 2.0  # Figure width of one cell
+
+# Scale marker positions, computed once
+_scale_theta = np.pi - np.pi * SCALE_VALUES / 100
+SCALE_POSITIONS = SCALE_RADIUS * np.column_stack([np.cos(_scale_theta), np.sin(_scale_theta)])
+
+
 def create_gauge_chart(value, max_value, title="Performance", mode='light'):
-    """Create a gauge chart using matplotlib."""
-    
+    """Create a gauge chart using matplotlib.
+
+    `value` and `max_value` may also be arrays, in which case the arcs for
+    all gauges are computed in one pass and a list of figures is returned.
+    """
     # Calculate percentage
-    percentage = (value / max_value) * 100
-    
-    # Configure colors based on mode
-    if mode == 'dark':
-        bg_color = '#1e1e1e'
-        text_color = 'white'
-        gauge_bg_color = '#3a3a3a'
-        gauge_value_color = '#42a5f5'  # Brighter blue for dark mode
-        scale_text_color = '#cccccc'
-    else:  # light mode
-        bg_color = 'white'
-        text_color = 'black'
-        gauge_bg_color = '#dcdbdb'
-        gauge_value_color = '#84d9e0'
-        scale_text_color = '#333333'
+    percentages = np.asarray(value, dtype=float) / np.asarray(max_value, dtype=float) * 100
     
+    # Build every value arc at once
+    value_arcs = gauge_arc_vertices(np.ravel(percentages) / 100)
+    
+    figs = [_draw_gauge(percentage, vertices_val, mode)
+            for percentage, vertices_val in zip(np.ravel(percentages), value_arcs)]
+    return figs if np.ndim(percentages) else figs[0]
+
+
+def _draw_gauge(percentage, vertices_val, mode='light'):
+    """Draw one gauge figure from a precomputed value arc."""
     # Create figure and axis with smaller size
-    fig, ax = plt.subplots(figsize=(4, 3), facecolor=bg_color)
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.subplots()
     ax.set_xlim(-1.2, 1.2)
     ax.set_ylim(-0.2, 1.3)
     ax.set_aspect('equal')
     ax.axis('off')
-    ax.set_facecolor(bg_color)
-    
-    # Define gauge parameters
-    center = (0, 0)
-    outer_radius = 1.0
-    inner_radius = 0.7
-    start_angle = 180
-    end_angle = 0
-    
-    # Create background arc (gray)
-    theta_bg = np.linspace(np.radians(start_angle), np.radians(end_angle), 100)
-    x_outer_bg = outer_radius * np.cos(theta_bg)
-    y_outer_bg = outer_radius * np.sin(theta_bg)
-    x_inner_bg = inner_radius * np.cos(theta_bg)
-    y_inner_bg = inner_radius * np.sin(theta_bg)
     
     # Draw gray background
-    vertices_bg = list(zip(x_outer_bg, y_outer_bg)) + list(zip(x_inner_bg[::-1], y_inner_bg[::-1]))
-    polygon_bg = patches.Polygon(vertices_bg, facecolor=gauge_bg_color, edgecolor='none')
+    polygon_bg = patches.Polygon(_background_arc(), edgecolor='none', gid='gauge_bg')
     ax.add_patch(polygon_bg)
     
-    # Create value arc (blue)
-    end_angle_value = 180 - (percentage / 100 * 180)
-    theta_val = np.linspace(np.radians(start_angle), np.radians(end_angle_value), 100)
-    x_outer_val = outer_radius * np.cos(theta_val)
-    y_outer_val = outer_radius * np.sin(theta_val)
-    x_inner_val = inner_radius * np.cos(theta_val)
-    y_inner_val = inner_radius * np.sin(theta_val)
-    
     # Draw blue value arc
-    vertices_val = list(zip(x_outer_val, y_outer_val)) + list(zip(x_inner_val[::-1], y_inner_val[::-1]))
-    polygon_val = patches.Polygon(vertices_val, facecolor=gauge_value_color, edgecolor='none')
+    polygon_val = patches.Polygon(vertices_val, edgecolor='none', gid='gauge_value')
     ax.add_patch(polygon_val)
     
     # Add scale markers
-    scale_values = [0, 20, 40, 60, 80, 100]
-    for val in scale_values:
-        angle = 180 - (val / 100 * 180)
-        angle_rad = np.radians(angle)
-        
-        # Position for text (outside the gauge)
-        text_radius = outer_radius + 0.10
-        x_text = text_radius * np.cos(angle_rad)
-        y_text = text_radius * np.sin(angle_rad)
-        
+    for val, (x_text, y_text) in zip(SCALE_VALUES, SCALE_POSITIONS):
         ax.text(x_text, y_text, str(val), 
-                ha='center', va='center', fontsize=10, color=scale_text_color)
+                ha='center', va='center', fontsize=10, gid='scale')
     
     # Add center value 
-    ax.text(0, 0.2, f'{percentage:.1f}%', 
+    ax.text(0, VALUE_TEXT_Y, f'{percentage:.1f}%', 
             ha='center', va='center', fontsize=36, 
-            fontweight='normal', color=text_color)
+            fontweight='normal', gid='value')
     
     # Add title with spacing
     ax.set_title('Sales Distribution by Product', 
                  pad=5, 
                  fontsize=12, 
-                 fontweight='bold',
-                 color=text_color)
+                 fontweight='bold')
     
-    # Set background color
-    fig.patch.set_facecolor(bg_color)
+    # Apply colors for the requested mode
+    apply_theme(fig, mode)
     
     return fig
 
 
-def main():
-    # Load data
-    df = load_data()
+def create_gauge_grid(values, max_values, titles=None, ncols=10, mode='light'):
+    """Lay out many gauges in a single figure.
+
+    All gauges share one axis: the background arcs are one collection
+    built from the cached arc, and the value arcs are a second collection.
+    Use update_gauge_grid() to show new values without rebuilding the
+    figure.
+    """
+    percentages = np.atleast_1d(np.asarray(values, dtype=float) / np.asarray(max_values, dtype=float) * 100)
+    n_gauges = len(percentages)
+    ncols = min(ncols, n_gauges)
+    nrows = -(-n_gauges // ncols)
+    
+    # Gauge centers, row by row from the top
+    index = np.arange(n_gauges)
+    centers = np.column_stack([
+        (index % ncols) * GRID_CELL_WIDTH,
+        -(index // ncols) * GRID_CELL_HEIGHT,
+    ])
     
+    # Create one figure sized to the grid
+    fig = Figure(figsize=(ncols * GRID_CELL_INCHES,
+                          nrows * GRID_CELL_INCHES * GRID_CELL_HEIGHT / GRID_CELL_WIDTH))
+    ax = fig.subplots()
+    fig.subplots_adjust(left=0, right=1, bottom=0, top=1)
+    ax.set_xlim(-GRID_CELL_WIDTH / 2, (ncols - 0.5) * GRID_CELL_WIDTH)
+    ax.set_ylim(-(nrows - 1) * GRID_CELL_HEIGHT - 0.2, 1.6)
+    ax.set_aspect('equal')
+    ax.axis('off')
+    
+    # Background and value arcs: the cached templates shifted to every center
+    backgrounds = PolyCollection(_background_arc() + centers[:, None, :],
+                                 edgecolor='none', gid='gauge_bg')
+    ax.add_collection(backgrounds)
+    arcs = PolyCollection(gauge_arc_vertices(percentages / 100) + centers[:, None, :],
+                          edgecolor='none', gid='gauge_value')
+    ax.add_collection(arcs)
+    
+    # Center values and titles
+    for (x, y), percentage in zip(centers, percentages):
+        ax.text(x, y + VALUE_TEXT_Y, f'{percentage:.1f}%', 
+                ha='center', va='center', fontsize=14, gid='value')
+    if titles is not None:
+        for (x, y), title in zip(centers, titles):
+            ax.text(x, y + 1.35, title, 
+                    ha='center', va='center', fontsize=9, fontweight='bold')
+    
+    # Apply colors for the requested mode
+    apply_theme(fig, mode)
+    
+    return fig
+
+
+def update_gauge_grid(fig, values, max_values):
+    """Show new values on a gauge grid made by create_gauge_grid()."""
+    ax = fig.axes[0]
+    percentages = np.atleast_1d(np.asarray(values, dtype=float) / np.asarray(max_values, dtype=float) * 100)
+    
+    arcs = next(c for c in ax.collections if c.get_gid() == 'gauge_value')
+    value_texts = [text for text in ax.texts if text.get_gid() == 'value']
+    if len(value_texts) != len(percentages):
+        raise ValueError(f"Expected {len(value_texts)} values, got {len(percentages)}")
+    
+    # The center labels sit just above each gauge center
+    centers = np.array([text.get_position() for text in value_texts]) - (0, VALUE_TEXT_Y)
+    
+    # Only the value arcs and the center labels change
+    arcs.set_verts(gauge_arc_vertices(percentages / 100) + centers[:, None, :])
+    for text, percentage in zip(value_texts, percentages):
+        text.set_text(f'{percentage:.1f}%')
+
+
+def apply_theme(fig, mode='light'):
+    """Restyle an existing gauge chart for the given mode."""
+    theme = get_theme(mode)
+
+    ax = fig.axes[0]
+    fig.set_facecolor(theme.bg)
+    ax.set_facecolor(theme.bg)
+    
+    # Recolor arcs (patches for one gauge, collections for a grid)
+    for artist in [*ax.patches, *ax.collections]:
+        if artist.get_gid() == 'gauge_bg':
+            artist.set_facecolor(theme.gauge_track)
+        elif artist.get_gid() == 'gauge_value':
+            artist.set_facecolor(theme.gauge_value)
+    
+    # Scale markers, center value and title
+    for text in ax.texts:
+        text.set_color(theme.scale_text if text.get_gid() == 'scale' else theme.text)
+    ax.title.set_color(theme.text)
+
+
+def create_chart(df, mode='light'):
+    """Create the gauge chart figure from monthly sales."""
     # Calculate total sales
     reported_sale = df["Sales"].iloc[0:8].sum()
     total_sales = df["Sales"].sum()
 
     # Create gauge chart with mode
-    fig = create_gauge_chart(reported_sale, total_sales, "PERFORMANCE", mode=MODE)
+    fig = create_gauge_chart(reported_sale, total_sales, "PERFORMANCE", mode=mode)
     
     # Adjust layout
-    plt.tight_layout()
+    with stage("layout"):
+        fit_layout(fig, OUTPUT_NAME)
+
+    return fig
+
+
+def update_chart(fig, df):
+    """Show new monthly sales on a gauge chart made by create_chart()."""
+    ax = fig.axes[0]
+    percentage = df["Sales"].iloc[0:8].sum() / df["Sales"].sum() * 100
+
+    # Only the value arc and the center label change
+    arc = next(patch for patch in ax.patches if patch.get_gid() == 'gauge_value')
+    arc.set_xy(gauge_arc_vertices([percentage / 100])[0])
+    text = next(text for text in ax.texts if text.get_gid() == 'value')
+    text.set_text(f'{percentage:.1f}%')
+
+
+def main():
+    # Load data
+    df = load_data()
     
-    # Save the figure to output folder
-    OUTPUT_FILE = Path("output") / f"gaugechart_{MODE}.png"
-    OUTPUT_FILE.parent.mkdir(exist_ok=True)
+    # Create gauge chart once
+    fig = create_chart(df, mode=MODE)
     
-    # Get background color for saving
-    bg_color = '#1e1e1e' if MODE == 'dark' else 'white'
-    plt.savefig(OUTPUT_FILE, dpi=150, bbox_inches='tight', facecolor=bg_color)
-    print(f"Gauge chart saved to: {OUTPUT_FILE} ({MODE} mode)")
+    # Save a light and a dark copy to output folder
+    for mode in ('light', 'dark'):
+        apply_theme(fig, mode)
+        OUTPUT_FILE = Path("output") / f"{OUTPUT_NAME}_{mode}.png"
+        OUTPUT_FILE.parent.mkdir(exist_ok=True)
+        
+        bbox = tight_bbox(fig, OUTPUT_NAME, DPI)
+        fig.savefig(OUTPUT_FILE, dpi=DPI, bbox_inches=bbox, facecolor=fig.get_facecolor())
+        print(f"Gauge chart saved to: {OUTPUT_FILE} ({mode} mode)")
     
-    # Show chart
-    plt.show()
+    # Open a preview window only when asked to
+    if SHOW:
+        apply_theme(fig, MODE)
+        show_figure(fig)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,174 @@
+# instrument.py
+"""Optional per-stage timing and profiling for chart renders.
+
+Turned off unless the CHART_METRICS environment variable names an output
+file. Files ending in .prom get Prometheus text format; anything else
+gets one JSON line per render:
+
+    CHART_METRICS=output/metrics.jsonl python render_all.py
+    CHART_METRICS=/var/lib/node_exporter/charts_{pid}.prom python server.py
+
+`{pid}` is replaced with the process id, so each render worker writes its
+own file. Set CHART_PROFILE=cprofile to add the slowest functions of each
+render to its JSON line, or CHART_PROFILE=tracemalloc to add its peak
+Python memory.
+
+When metrics are off, stage() and render() hand back a shared no-op
+context manager, so instrumented code pays for one function call.
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+PROFILES = ('cprofile', 'tracemalloc')
+PROFILE_TOP = 15  # Functions listed per render by the cProfile capture
+
+_NULL = contextlib.nullcontext()
+_metrics_file = None
+_profile = None
+# The render being timed, per thread, so parallel renders never share a record
+_current = contextvars.ContextVar('render', default=None)
+_lock = threading.Lock()  # Guards the Prometheus totals and the metrics file
+_totals = {}     # (chart, stage) -> [renders, seconds], for the Prometheus file
+_counts = {}     # (chart, status) -> renders
+
+
+def configure(metrics_file=None, profile=None):
+    """Turn metrics on for this process, or off when `metrics_file` is None."""
+    global _metrics_file, _profile
+    if profile and profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}'. Options: {list(PROFILES)}")
+    _metrics_file = str(metrics_file) if metrics_file else None
+    _profile = profile or None
+
+
+def enabled():
+    return _metrics_file is not None
+
+
+def stage(name):
+    """Time a block as one stage of the render in progress.
+
+    Outside a render, or with metrics off, the block is not timed. A stage
+    entered more than once in a render adds up.
+    """
+    record = _current.get()
+    if record is None:
+        return _NULL
+    return _Stage(name, record)
+
+
+def render(chart, mode=None, fmt=None):
+    """Time one render and write its metrics when the block exits.
+
+    Renders started inside another render count towards the outer one.
+    """
+    if _metrics_file is None or _current.get() is not None:
+        return _NULL
+    return _Render(chart, mode, fmt)
+
+
+class _Stage:
+    def __init__(self, name, record):
+        self.name = name
+        self.record = record
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        stages = self.record["stages"]
+        stages[self.name] = stages.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+class _Render:
+    def __init__(self, chart, mode, fmt):
+        self.record = {"chart": chart, "mode": mode, "format": fmt, "pid": os.getpid(), "stages": {}}
+        self.profiler = None
+
+    def __enter__(self):
+        self.token = _current.set(self.record)
+        if _profile == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif _profile == 'tracemalloc':
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.record["time"] = time.time()
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        record = self.record
+        record["total"] = time.perf_counter() - self.start
+        record["status"] = "ok" if exc_type is None else "error"
+        if self.profiler is not None:
+            self.profiler.disable()
+            record["profile"] = top_functions(self.profiler)
+        elif _profile == 'tracemalloc':
+            record["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024**2
+        _current.reset(self.token)
+        with _lock:
+            write(record)
+
+
+def top_functions(profiler, n=PROFILE_TOP):
+    """Return the `n` functions with the most cumulative time as short strings."""
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    lines = []
+    for func in stats.fcn_list[:n]:
+        _, calls, _, cumulative, _ = stats.stats[func]
+        filename, line, function = func
+        lines.append(f"{cumulative:.4f}s {calls}x {Path(filename).name}:{line}({function})")
+    return lines
+
+
+def write(record):
+    """Append a render record to the metrics file, or refresh the Prometheus file."""
+    metrics_file = Path(_metrics_file.replace("{pid}", str(record["pid"])))
+    metrics_file.parent.mkdir(parents=True, exist_ok=True)
+
+    if metrics_file.suffix != ".prom":
+        with open(metrics_file, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        return
+
+    chart = record["chart"]
+    stages = {**record["stages"], "total": record["total"]}
+    for name, seconds in stages.items():
+        total = _totals.setdefault((chart, name), [0, 0.0])
+        total[0] += 1
+        total[1] += seconds
+    _counts[(chart, record["status"])] = _counts.get((chart, record["status"]), 0) + 1
+
+    pid = record["pid"]
+    lines = [
+        "# HELP chart_stage_seconds Time spent in each render stage.",
+        "# TYPE chart_stage_seconds summary",
+    ]
+    for (chart, name), (count, seconds) in sorted(_totals.items()):
+        labels = f'chart="{chart}",stage="{name}",pid="{pid}"'
+        lines.append(f"chart_stage_seconds_sum{{{labels}}} {seconds:.6f}")
+        lines.append(f"chart_stage_seconds_count{{{labels}}} {count}")
+    lines += [
+        "# HELP chart_renders_total Renders by outcome.",
+        "# TYPE chart_renders_total counter",
+    ]
+    for (chart, status), count in sorted(_counts.items()):
+        lines.append(f'chart_renders_total{{chart="{chart}",status="{status}",pid="{pid}"}} {count}')
+
+    # Replace the file in one step so a scraper never reads half of it
+    tmp_file = metrics_file.with_suffix(".tmp")
+    tmp_file.write_text("\n".join(lines) + "\n")
+    tmp_file.replace(metrics_file)
+
+
+configure(os.environ.get("CHART_METRICS"), os.environ.get("CHART_PROFILE"))
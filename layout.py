@@ -0,0 +1,151 @@
+# layout.py
+"""Cached figure layouts, so text extents are measured once per layout.
+
+tight_layout() and savefig(bbox_inches='tight') both draw the figure to
+measure its text before the real render. The charts have fixed sizes and
+fonts, so the results only change when the text does. Both are stored
+under a key made of the chart, figure size, dpi and every visible text
+with its font and position, and reused when the same layout comes up
+again.
+
+Layouts are kept in memory only, so rendering to bytes never touches
+the filesystem. render_all.py calls use_file() to also keep them in
+the output folder between runs.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import matplotlib
+from matplotlib import rcParams
+from matplotlib.transforms import Bbox
+from matplotlib.text import Text
+
+LAYOUT_NAME = ".layout_cache.json"  # File name used in an output folder
+FIXED_LAYOUT = True  # False measures every figure, like plain tight_layout()
+SUBPLOT_PARAMS = ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')
+MAX_LAYOUTS = 1000  # Oldest layouts are dropped past this, e.g. for ever-changing labels
+
+LAYOUT_FILE = None  # Where layouts are kept between runs; None keeps them in memory
+
+_layouts = None  # key -> subplot params or padded bbox
+_lock = threading.Lock()  # Server threads store layouts concurrently
+
+
+def layout_key(fig, name, *extra):
+    """Hash everything that moves the text of a figure into one key."""
+    # Tick labels are only filled in when asked for
+    for ax in fig.axes:
+        ax.xaxis.get_majorticklabels()
+        ax.yaxis.get_majorticklabels()
+
+    texts = [
+        [text.get_text(), str(text.get_fontproperties()), text.get_rotation(),
+         [float(v) for v in text.get_position()]]
+        for text in fig.findobj(Text) if text.get_visible() and text.get_text()
+    ]
+    payload = [name, matplotlib.__version__, list(fig.get_size_inches()),
+               [list(ax.get_position().bounds) for ax in fig.axes], texts, *extra]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+def fit_layout(fig, name):
+    """Apply tight_layout() margins, measuring them only for a new layout."""
+    if not FIXED_LAYOUT:
+        fig.tight_layout()
+        return
+
+    key = layout_key(fig, name, 'subplotpars')
+    params = _load().get(key)
+    if params is None:
+        fig.tight_layout()
+        params = {param: getattr(fig.subplotpars, param) for param in SUBPLOT_PARAMS}
+        _store(key, params)
+    else:
+        fig.subplots_adjust(**params)
+
+
+def tight_bbox(fig, name, dpi):
+    """Return the area savefig(bbox_inches='tight') would keep, padded, in inches.
+
+    Pass the result as `bbox_inches` to skip savefig's measuring pass.
+    """
+    if not FIXED_LAYOUT:
+        return 'tight'
+
+    key = layout_key(fig, name, 'bbox', dpi)
+    bounds = _load().get(key)
+    if bounds is None:
+        bounds = measure_bbox(fig, dpi).bounds
+        _store(key, bounds)
+    return Bbox.from_bounds(*bounds)
+
+
+def measure_bbox(fig, dpi):
+    """Draw the figure at `dpi` without rendering and return its padded tight bbox."""
+    original_dpi = fig.dpi
+    fig.dpi = dpi
+    try:
+        fig.draw_without_rendering()
+        bbox = fig.get_tightbbox()
+    finally:
+        fig.dpi = original_dpi
+    pad = rcParams['savefig.pad_inches']
+    return bbox.padded(pad, pad)
+
+
+def use_file(layout_file):
+    """Keep layouts in `layout_file` between runs, or in memory only when None."""
+    global LAYOUT_FILE, _layouts
+    layout_file = Path(layout_file) if layout_file else None
+    if layout_file != LAYOUT_FILE:
+        LAYOUT_FILE = layout_file
+        _layouts = None  # Read the new file on the next lookup
+
+
+def _load():
+    global _layouts
+    if _layouts is None:
+        _layouts = {}
+        if LAYOUT_FILE is not None:
+            try:
+                _layouts.update(json.loads(LAYOUT_FILE.read_text()))
+            except (OSError, ValueError):
+                pass  # Start empty; layouts are measured again as needed
+    return _layouts
+
+
+def _store(key, value):
+    """Remember a layout, and add it to LAYOUT_FILE when there is one."""
+    with _lock:
+        _layouts[key] = value
+        while len(_layouts) > MAX_LAYOUTS:
+            del _layouts[next(iter(_layouts))]
+        if LAYOUT_FILE is not None:
+            _save()
+
+
+def _save():
+    """Write the layouts to LAYOUT_FILE, keeping entries from other processes."""
+    try:
+        stored = json.loads(LAYOUT_FILE.read_text())
+    except (OSError, ValueError):
+        stored = {}
+    stored.update(_layouts)
+    stored = dict(list(stored.items())[-MAX_LAYOUTS:])
+
+    LAYOUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = LAYOUT_FILE.with_name(f"{LAYOUT_FILE.name}.{os.getpid()}.tmp")
+    tmp_file.write_text(json.dumps(stored))
+    tmp_file.replace(LAYOUT_FILE)
+
+
+def clear():
+    """Forget every cached layout, in memory and on disk."""
+    global _layouts
+    _layouts = {}
+    if LAYOUT_FILE is not None:
+        LAYOUT_FILE.unlink(missing_ok=True)
@@ -1,108 +1,294 @@
 # linechart.py
 """Line Chart."""
 
+import warnings
+
+import numpy as np
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from pathlib import Path
 
+from categories import MONTHS, thin_ticks, tick_label_pixels
+from chartdata import load_aggregated
+from charts import show_figure
+from instrument import stage
+from layout import fit_layout, tight_bbox
+from themes import get_theme
+
 # ============================================
 # CONFIGURATION - Change mode here
 # ============================================
 MODE = 'light'  # Options: 'dark' or 'light'
+SHOW = False    # Open a preview window after saving
 # ============================================
 
+CSV_FILE = Path("data") / "monthly_sales.csv"
+DATA_KEY = 'totals by Month'  # Charts with the same CSV_FILE and DATA_KEY share one loaded frame
+OUTPUT_NAME = "linechart"
+DPI = 72
+FIGSIZE = (6, 4)
+
+# Long series are reduced to about one bucket per horizontal pixel
+DECIMATION = 'minmax'  # Options: 'minmax' or 'lttb'
+MARKER_LIMIT = 100     # Markers are hidden when more points than this are drawn
 
-def load_data():
+
+def load_data(csv_file=CSV_FILE):
     """Load data from CSV file."""
-    CSV_FILE = Path("data") / "monthly_sales.csv"
-    
     # Check if file exists
-    if not CSV_FILE.exists():
-        raise FileNotFoundError(f"{CSV_FILE} not found")
-    
-    # Load the dataframe
-    df = pd.read_csv(CSV_FILE)
-    
-    # Validate required columns
+    if not csv_file.exists():
+        raise FileNotFoundError(f"{csv_file} not found")
+
+    # Stream the file, summing Sales per Month
+    df = load_aggregated(csv_file, by='Month', value='Sales')
+    validate_data(df)
+    return df
+
+
+def validate_data(df):
+    """Validate required columns."""
     required_cols = ['Month', 'Sales']
     if not all(col in df.columns for col in required_cols):
         raise ValueError(f"CSV must contain columns: {required_cols}")
-    
-    return df
 
 
-def main():
-    # Load data
-    df = load_data()
-    
-    # Configure style based on MODE
-    if MODE == 'dark':
-        plt.style.use('dark_background')
-        bg_color = '#1e1e1e'
-        text_color = 'white'
-        grid_color = 'gray'
-        marker_color = sns.color_palette("bright")[1]
-        line_color = sns.color_palette("bright")[2]
-    else:  # light mode
-        plt.style.use('default')
-        bg_color = 'white'
-        text_color = 'black'
-        grid_color = 'gray'
-        marker_color = sns.color_palette("pastel")[1]
-        line_color = sns.color_palette("pastel")[2]
-    
-    # Create figure with appropriate background
-    fig, ax = plt.subplots(figsize=(6, 4), facecolor=bg_color)
-    ax.set_facecolor(bg_color)
-    
-    # Create line chart
-    ax.plot(
-        df['Month'],
-        df['Sales'],
-        marker='o',
-        markerfacecolor=marker_color,
+def x_values(x):
+    """Parse text x values as times where possible.
+
+    Timestamps such as minute-level data then get a time axis instead of
+    one category per point. Month names and other text are returned as
+    they are.
+    """
+    if pd.api.types.is_numeric_dtype(x) or pd.api.types.is_datetime64_any_dtype(x):
+        return x
+    if pd.Index(MONTHS).get_indexer(x).min(initial=0) >= 0:
+        return x
+    with warnings.catch_warnings(action='ignore'):  # No common format means plain text
+        try:
+            return pd.to_datetime(x)
+        except (TypeError, ValueError):
+            return x
+
+
+def label_ticks(ax, line):
+    """Label as many text x values as fit under the axis."""
+    labels = np.asarray(line.get_xdata())
+    if labels.dtype.kind in 'iufM':  # Numbers and times get matplotlib's own ticks
+        return
+
+    # Labels are turned 45 degrees, so each needs about twice its height
+    label_pixels = 2 * tick_label_pixels(DPI, 'x')
+    _, labels = thin_ticks(labels, ax.get_position().width * FIGSIZE[0] * DPI, label_pixels)
+    ax.set_xticks(ax.xaxis.convert_units(labels), labels, rotation=45, ha='right')
+
+
+def _positions(x):
+    """Return x as floats: numbers and times as-is, anything else by index."""
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(float)
+    return np.arange(len(x), dtype=float)
+
+
+def minmax_indices(y, n_buckets):
+    """Keep the lowest and highest point of each bucket.
+
+    `y` is split into `n_buckets` runs of consecutive points. Keeping both
+    extremes of every run draws the same envelope as the full series when
+    each run covers about one pixel. Returns sorted indices into `y`,
+    always including the first and last point.
+    """
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+
+    # Pad with the last value so every bucket has the same size
+    size = -(-n // n_buckets)
+    rows = np.concatenate([y, np.full(-n % size, y[-1])]).reshape(-1, size)
+    starts = np.arange(len(rows)) * size
+
+    indices = np.concatenate([[0, n - 1], starts + rows.argmin(axis=1), starts + rows.argmax(axis=1)])
+    return np.unique(np.minimum(indices, n - 1))
+
+
+def lttb_indices(x, y, n_out):
+    """Downsample with Largest-Triangle-Three-Buckets.
+
+    The points between the first and last are split into `n_out - 2`
+    buckets. From each bucket the point forming the largest triangle with
+    the previously kept point and the average of the next bucket is kept.
+    Work inside a bucket is vectorized, so the Python loop runs once per
+    output point. Returns sorted indices into `y`.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    # Bucket boundaries, and the average point of each bucket
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+
+    # The last bucket looks ahead to the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    indices = np.empty(n_out, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        area = np.abs((x[a] - next_x[bucket]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (next_y[bucket] - y[a]))
+        a = lo + int(area.argmax())
+        indices[bucket + 1] = a
+    return indices
+
+
+def decimate(x, y, method=DECIMATION, n_pixels=None):
+    """Reduce a series to about two points per horizontal pixel.
+
+    Returns the kept x and y values.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n_pixels = n_pixels or int(FIGSIZE[0] * DPI)
+
+    if method == 'minmax':
+        indices = minmax_indices(y, n_pixels)
+    elif method == 'lttb':
+        indices = lttb_indices(_positions(x), y, 2 * n_pixels)
+    else:
+        raise ValueError(f"Unknown decimation method '{method}'. Options: ['minmax', 'lttb']")
+    return x[indices], y[indices]
+
+
+def plot_series(ax, x, y, method=DECIMATION, n_pixels=None):
+    """Plot a line, decimated to the width of the plot for long series.
+
+    Rendering time then depends on the output resolution rather than on
+    the number of points. Markers are only drawn for short series.
+    """
+    x, y = decimate(x, y, method, n_pixels)
+
+    line, = ax.plot(
+        x,
+        y,
+        marker='o' if len(y) <= MARKER_LIMIT else None,
         linestyle='-',
-        color=line_color,
         linewidth=2
     )
+    return line
+
+
+def create_chart(df, mode='light', method=DECIMATION):
+    """Create the line chart figure.
+
+    Works for a few months or for long time series: with more points than
+    the figure is pixels wide, the line is decimated with `method`.
+    """
+    # Create figure
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.subplots()
+
+    # Create line chart
+    line = plot_series(ax, x_values(df['Month']), df['Sales'], method=method)
+    label_ticks(ax, line)
 
     # Add title and axis labels
-    ax.set_title('Monthly Sales Trend', 
-                 pad=10, 
-                 fontsize=14, 
-                 fontweight='bold',
-                 color=text_color)
-    ax.set_xlabel('Month', fontweight='bold', color=text_color)
-    ax.set_ylabel('Sales', fontweight='bold', color=text_color)
-    
-    # Set tick colors
-    ax.tick_params(colors=text_color, which='both')
-    
+    ax.set_title('Monthly Sales Trend',
+                 pad=10,
+                 fontsize=14,
+                 fontweight='bold')
+    ax.set_xlabel('Month', fontweight='bold')
+    ax.set_ylabel('Sales', fontweight='bold')
+
     # Add grid
-    ax.grid(True, linestyle='-', alpha=0.3, color=grid_color)
-    
+    ax.grid(True, linestyle='-', alpha=0.3)
+
     # Rotate x-axis labels for better readability
-    plt.xticks(rotation=45, ha='right')
-    
+    for label in ax.get_xticklabels():
+        label.set(rotation=45, ha='right')
+
     # Adjust layout to prevent label cutoff
-    plt.tight_layout()
-    
+    with stage("layout"):
+        fit_layout(fig, OUTPUT_NAME)
+
     # Remove outside border (spines)
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
     ax.spines['bottom'].set_visible(False)
     ax.spines['left'].set_visible(False)
 
-    # Save the figure to output folder
-    OUTPUT_FILE = Path("output") / f"linechart_{MODE}.png"
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(OUTPUT_FILE, dpi=72, bbox_inches='tight', facecolor=bg_color)
-    print(f"Chart saved to: {OUTPUT_FILE} ({MODE} mode)")
+    # Apply colors for the requested mode
+    apply_theme(fig, mode)
+
+    return fig
+
+
+def update_chart(fig, df, method=DECIMATION):
+    """Show new data on a line chart made by create_chart().
+
+    Only the line's points and the axis limits change; titles, grid and
+    colors are kept.
+    """
+    ax = fig.axes[0]
+    line = ax.lines[0]
+
+    x, y = decimate(x_values(df['Month']), df['Sales'], method)
+    line.set_data(x, y)
+    line.set_marker('o' if len(y) <= MARKER_LIMIT else '')
+    label_ticks(ax, line)
+
+    # Limits from the one line only
+    ax.relim()
+    ax.autoscale_view()
+
+
+def apply_theme(fig, mode='light'):
+    """Restyle an existing chart for the given mode."""
+    theme = get_theme(mode)
+
+    ax = fig.axes[0]
+    fig.set_facecolor(theme.bg)
+    ax.set_facecolor(theme.bg)
+
+    # Recolor line and markers
+    line = ax.lines[0]
+    line.set_color(theme.palette[2])
+    line.set_markeredgecolor(theme.palette[2])
+    line.set_markerfacecolor(theme.palette[1])
+
+    # Title, labels, ticks and grid
+    ax.title.set_color(theme.text)
+    ax.xaxis.label.set_color(theme.text)
+    ax.yaxis.label.set_color(theme.text)
+    ax.tick_params(colors=theme.text, which='both', grid_color=theme.grid)
+
+
+def main():
+    # Load data
+    df = load_data()
+
+    # Create chart once
+    fig = create_chart(df, mode=MODE)
+
+    # Save a light and a dark copy to output folder
+    for mode in ('light', 'dark'):
+        apply_theme(fig, mode)
+        OUTPUT_FILE = Path("output") / f"{OUTPUT_NAME}_{mode}.png"
+        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        bbox = tight_bbox(fig, OUTPUT_NAME, DPI)
+        fig.savefig(OUTPUT_FILE, dpi=DPI, bbox_inches=bbox, facecolor=fig.get_facecolor())
+        print(f"Chart saved to: {OUTPUT_FILE} ({mode} mode)")
 
-    # Show chart
-    plt.show()
+    # Open a preview window only when asked to
+    if SHOW:
+        apply_theme(fig, MODE)
+        show_figure(fig)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
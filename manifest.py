@@ -0,0 +1,91 @@
+# manifest.py
+"""Content-hash manifest used to skip charts whose inputs have not changed."""
+
+import hashlib
+import json
+from pathlib import Path
+
+MANIFEST_NAME = ".render_manifest.json"
+MANIFEST_VERSION = 2  # Bump when the recorded inputs change, so every chart renders once
+
+
+def load_manifest(output_dir):
+    """Load the manifest stored in the output folder, or an empty one."""
+    manifest_file = Path(output_dir) / MANIFEST_NAME
+    if not manifest_file.exists():
+        return {}
+    try:
+        return json.loads(manifest_file.read_text())
+    except (OSError, ValueError):
+        print(f"Warning: ignoring unreadable manifest {manifest_file}")
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    """Write the manifest to the output folder."""
+    manifest_file = Path(output_dir) / MANIFEST_NAME
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = manifest_file.with_suffix(".tmp")
+    tmp_file.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp_file.replace(manifest_file)
+
+
+def fingerprint(path, previous=None):
+    """Return the size, mtime and SHA-256 of a file.
+
+    When the size and mtime match `previous`, its hash is reused instead
+    of reading the file again.
+    """
+    stat = Path(path).stat()
+    if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+        return previous
+
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+
+def render_key(name, mode, dpi, figsize, inputs):
+    """Hash the chart settings and input file hashes into one key."""
+    payload = {
+        "version": MANIFEST_VERSION,
+        "chart": name,
+        "mode": mode,
+        "dpi": dpi,
+        "figsize": list(figsize),
+        "inputs": {path: inputs[path]["sha256"] for path in sorted(inputs)},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def is_fresh(manifest, name, mode):
+    """Check whether a rendered chart is still up to date.
+
+    Uses only what was recorded in the manifest, so the chart module
+    does not have to be imported to decide.
+    """
+    entry = manifest.get(f"{name}:{mode}")
+    if entry is None or not Path(entry["output_file"]).exists():
+        return False
+
+    inputs = {}
+    for path, previous in entry["inputs"].items():
+        if not Path(path).exists():
+            return False
+        inputs[path] = fingerprint(path, previous)
+
+    # Keep the refreshed mtimes so unchanged files are not re-hashed next time
+    entry["inputs"] = inputs
+    return entry["key"] == render_key(name, mode, entry["dpi"], entry["figsize"], inputs)
+
+
+def record(manifest, name, mode, output_file, input_files, dpi, figsize):
+    """Store the fingerprint of a chart that was just rendered."""
+    inputs = {str(path): fingerprint(path) for path in input_files}
+    manifest[f"{name}:{mode}"] = {
+        "output_file": str(output_file),
+        "dpi": dpi,
+        "figsize": list(figsize),
+        "inputs": inputs,
+        "key": render_key(name, mode, dpi, figsize, inputs),
+    }
@@ -1,107 +1,243 @@
-import pandas as pd
-import geopandas as gpd
-import matplotlib.pyplot as plt
+import functools
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
 from pathlib import Path
 
+from chartdata import load_aggregated
+from instrument import stage
+from layout import tight_bbox
+from themes import get_theme
+
 # ============================================
 # CONFIGURATION - Change mode here
 # ============================================
 MODE = 'light'  # Options: 'dark' or 'light'
 # ============================================
 
+CSV_FILE = Path("data") / "states.csv"
+DATA_KEY = 'totals by State'  # Charts with the same CSV_FILE and DATA_KEY share one loaded frame
+OUTPUT_NAME = "us_population_map"
+DPI = 150
+FIGSIZE = (7, 4)
+
+STATES_URL = "https://naciscdn.org/naturalearth/110m/cultural/ne_110m_admin_1_states_provinces.zip"
+STATES_CACHE = Path("data") / "us_states.parquet"  # Continental US shapes (GeoParquet)
+SIMPLIFY_PIXELS = 0.5  # Drop detail smaller than this many output pixels
+
 
-def load_data():
+def load_data(csv_file=CSV_FILE):
     """Load data from CSV file."""
-    CSV_FILE = Path("data") / "states.csv"
-    
     # Check if file exists
-    if not CSV_FILE.exists():
-        raise FileNotFoundError(f"{CSV_FILE} not found")
-    
-    # Load the dataframe
-    df = pd.read_csv(CSV_FILE)
-    
-    # Validate required columns
+    if not csv_file.exists():
+        raise FileNotFoundError(f"{csv_file} not found")
+
+    # Stream the file, summing Population per state
+    df = load_aggregated(csv_file, by=['State', 'Code'], value='Population')
+    validate_data(df)
+    return df
+
+
+def validate_data(df):
+    """Validate required columns."""
     required_cols = ['State', 'Code', 'Population']
     if not all(col in df.columns for col in required_cols):
         raise ValueError(f"CSV must contain columns: {required_cols}")
-    
-    return df
 
-def main():
-    # Load data
-    df = load_data()
-    
-    # Handle edge cases
-    if df.empty:
-        print("No data to display")
-        return
-    
+
+def build_states_cache(source=STATES_URL, cache_file=STATES_CACHE):
+    """Filter Natural Earth states to the continental US and cache them.
+
+    The source can be the Natural Earth URL or a local copy of the zip
+    file, so offline machines can build the cache from a vendored file.
+    """
+    import geopandas as gpd  # Loaded only when a map is drawn
+
     # Load US states shapefile
-    url = "https://naciscdn.org/naturalearth/110m/cultural/ne_110m_admin_1_states_provinces.zip"
-    states = gpd.read_file(url)
-    
+    states = gpd.read_file(source)
+
     # Filter for USA (excluding Alaska and Hawaii for better visualization)
     usa = states[states['admin'] == 'United States of America']
     usa = usa[~usa['postal'].isin(['AK', 'HI'])]  # Exclude Alaska and Hawaii
-    
-    # Merge with population data
-    usa = usa.merge(df, left_on='postal', right_on='Code', how='left')
-    
-    # Configure style based on MODE
-    if MODE == 'dark':
-        plt.style.use('dark_background')
-        bg_color = '#1e1e1e'
-        text_color = 'white'
-        edge_color = '#555555'
-        missing_color = '#2a2a2a'
-        cmap = 'Blues'  # Blues works well on dark backgrounds
-    else:  # light mode
-        plt.style.use('default')
-        bg_color = 'white'
-        text_color = 'black'
-        edge_color = 'black'
-        missing_color = '#eaeaea'
-        cmap = 'Blues'
-    
-    # Create figure with smaller size and appropriate background
-    fig, ax = plt.subplots(figsize=(7, 4), facecolor=bg_color)
-    ax.set_facecolor(bg_color)
-    
+    usa = usa[['postal', 'name', 'geometry']].reset_index(drop=True)
+
+    # Save as GeoParquet (requires pyarrow)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        usa.to_parquet(cache_file)
+    except ImportError:
+        print("Warning: pyarrow is not installed, state shapes were not cached")
+
+    return usa
+
+
+@functools.lru_cache(maxsize=None)
+def load_states(cache_file=STATES_CACHE):
+    """Load continental US state shapes, building the cache on first use.
+
+    The result is kept in memory and shared by every map rendered in
+    this process, so treat it as read-only.
+    """
+    import geopandas as gpd  # Loaded only when a map is drawn
+
+    if cache_file.exists():
+        return gpd.read_parquet(cache_file)
+    return build_states_cache(cache_file=cache_file)
+
+
+@functools.lru_cache(maxsize=None)
+def load_state_shapes(dpi=DPI, width=FIGSIZE[0]):
+    """Return state shapes indexed by postal code, simplified for a resolution.
+
+    Shapes are simplified so that no detail smaller than SIMPLIFY_PIXELS
+    is kept when the map is drawn `width` inches wide at `dpi`. The result
+    is computed once per resolution and reused by every map.
+    """
+    states = load_states().set_index('postal')
+
+    # Size of one output pixel in map units
+    minx, _, maxx, _ = states.total_bounds
+    pixel_size = (maxx - minx) / (width * dpi)
+
+    geometry = states.geometry.simplify(pixel_size * SIMPLIFY_PIXELS, preserve_topology=True)
+    return states.set_geometry(geometry)
+
+
+def join_values(shapes, df, column='Population', key='Code'):
+    """Align a data column with the state shapes by postal code.
+
+    Returns a Series in the same order as `shapes`, with NaN for states
+    that have no data.
+    """
+    if df[key].duplicated().any():
+        raise ValueError(f"{key} column must not contain duplicates")
+    return df.set_index(key)[column].reindex(shapes.index)
+
+
+def create_chart(df, mode='light', column='Population'):
+    """Create the population map figure.
+
+    The state shapes are drawn once as a single collection; use
+    recolor_map() to show another column on the same figure.
+    """
+    with stage("shapes"):
+        shapes = load_state_shapes(DPI, FIGSIZE[0])
+
+    # Create figure with smaller size
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.subplots()
+
     # Plot the map (continental US only)
-    usa.plot(column='Population', 
-             ax=ax, 
-             cmap=cmap,
-             legend=True,
-             edgecolor=edge_color,
-             linewidth=0.5,
-             missing_kwds={'color': missing_color})
-    
+    shapes.plot(ax=ax, linewidth=0.5)
+    collection = ax.collections[0]
+    collection.set_gid('states')
+    collection.set_cmap('Blues')  # Blues works well on both backgrounds
+
+    # The colorbar follows the collection when it is recolored
+    fig.colorbar(collection, ax=ax)
+
     # Add title with smaller font
-    ax.set_title('U.S. States by Population (Continental US)', 
-                 fontsize=14, 
-                 pad=15,
-                 color=text_color)
+    ax.set_title('', fontsize=14, pad=15)
     ax.axis('off')
-    
-    # Style the colorbar for dark mode
-    if MODE == 'dark':
-        # Get the colorbar and style it
-        cbar = fig.axes[-1]  # The colorbar is the last axis
-        cbar.tick_params(colors=text_color)
-        # Style colorbar labels
-        plt.setp(plt.getp(cbar, 'yticklabels'), color=text_color)
-    
-    # Ensure output directory exists
-    OUTPUT_FILE = Path("output") / f"us_population_map_{MODE}.png"
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Save as PNG
-    plt.savefig(OUTPUT_FILE, dpi=150, bbox_inches='tight', facecolor=bg_color)
-    print(f"Map saved to: {OUTPUT_FILE} ({MODE} mode)")
-    
-    # Clean up
-    plt.close(fig)
+
+    # Fill in the data and apply colors for the requested mode
+    recolor_map(fig, df, column)
+    apply_theme(fig, mode)
+
+    return fig
+
+
+def recolor_map(fig, df, column='Population', key='Code', title=None):
+    """Show another data column on an existing map.
+
+    Only the face colors, color limits and title change; the state
+    shapes, borders and colorbar are reused.
+    """
+    ax = fig.axes[0]
+    collection = next(c for c in ax.collections if c.get_gid() == 'states')
+
+    # Join data on the postal code index
+    shapes = load_state_shapes(DPI, FIGSIZE[0])
+    with stage("merge"):
+        values = join_values(shapes, df, column, key).to_numpy(dtype=float)
+
+    # One path per state; states without data use the colormap's "bad" color
+    collection.set_array(np.ma.masked_invalid(values))
+    collection.set_clim(np.nanmin(values), np.nanmax(values))
+
+    if title is None:
+        title = f'U.S. States by {column} (Continental US)'
+    ax.title.set_text(title)
+
+
+def update_chart(fig, df, column='Population'):
+    """Show new data on a map made by create_chart(); see recolor_map()."""
+    recolor_map(fig, df, column)
+
+
+def render_maps(df, columns, mode=MODE, output_dir=Path("output")):
+    """Save one map per data column, drawing the state shapes only once."""
+    fig = create_chart(df, mode=mode, column=columns[0])
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    saved = []
+    for column in columns:
+        recolor_map(fig, df, column)
+        output_file = output_dir / f"us_{column.lower()}_map_{mode}.png"
+        bbox = tight_bbox(fig, OUTPUT_NAME, DPI)
+        fig.savefig(output_file, dpi=DPI, bbox_inches=bbox, facecolor=fig.get_facecolor())
+        saved.append(output_file)
+
+    return saved
+
+
+def apply_theme(fig, mode='light'):
+    """Restyle an existing map for the given mode."""
+    theme = get_theme(mode)
+
+    ax = fig.axes[0]
+    fig.set_facecolor(theme.bg)
+    ax.set_facecolor(theme.bg)
+
+    # Recolor state borders and states without data
+    for collection in ax.collections:
+        if collection.get_gid() == 'states':
+            cmap = matplotlib.colormaps[collection.get_cmap().name]
+            collection.set_cmap(cmap.with_extremes(bad=theme.missing))
+        collection.set_edgecolor(theme.border)
+
+    ax.title.set_color(theme.text)
+
+    # Style the colorbar
+    cbar = fig.axes[-1]  # The colorbar is the last axis
+    cbar.tick_params(colors=theme.text)
+    cbar.spines['outline'].set_edgecolor(theme.text)
+
+
+def main():
+    # Load data
+    df = load_data()
+
+    # Handle edge cases
+    if df.empty:
+        print("No data to display")
+        return
+
+    # Create map once
+    fig = create_chart(df, mode=MODE)
+
+    for mode in ('light', 'dark'):
+        apply_theme(fig, mode)
+
+        # Ensure output directory exists
+        OUTPUT_FILE = Path("output") / f"{OUTPUT_NAME}_{mode}.png"
+        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+
+        # Save as PNG
+        bbox = tight_bbox(fig, OUTPUT_NAME, DPI)
+        fig.savefig(OUTPUT_FILE, dpi=DPI, bbox_inches=bbox, facecolor=fig.get_facecolor())
+        print(f"Map saved to: {OUTPUT_FILE} ({mode} mode)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
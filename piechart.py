@@ -1,109 +1,140 @@
 # piechart.py
 """Pie Chart."""
 
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from pathlib import Path
 
+from chartdata import OTHER, load_aggregated, top_n
+from charts import show_figure
+from layout import tight_bbox
+from themes import get_theme
+
 # ============================================
 # CONFIGURATION - Change mode here
 # ============================================
 MODE = 'dark'  # Options: 'dark' or 'light'
+SHOW = False    # Open a preview window after saving
 # ============================================
 
+CSV_FILE = Path("data") / "product_sales.csv"
+DATA_KEY = 'totals by Product'  # Charts with the same CSV_FILE and DATA_KEY share one loaded frame
+OUTPUT_NAME = "piechart"
+DPI = 72
+FIGSIZE = (6, 4)
+TOP_N = 10  # Products shown before the rest are grouped as "Other"
+
 
-def load_data():
+def load_data(csv_file=CSV_FILE):
     """Load data from CSV file."""
-    CSV_FILE = Path("data") / "product_sales.csv"
-    
     # Check if file exists
-    if not CSV_FILE.exists():
-        raise FileNotFoundError(f"{CSV_FILE} not found")
-    
-    # Load the dataframe
-    df = pd.read_csv(CSV_FILE)
-    
-    # Validate required columns
+    if not csv_file.exists():
+        raise FileNotFoundError(f"{csv_file} not found")
+
+    # Stream the file, summing Sales per Product
+    df = load_aggregated(csv_file, by='Product', value='Sales')
+    validate_data(df)
+    return df
+
+
+def validate_data(df):
+    """Validate required columns."""
     if not all(col in df.columns for col in ['Product', 'Sales']):
         raise ValueError("CSV must contain 'Product' and 'Sales' columns")
-    
-    return df
 
 
-def main():
-    # Load data
-    df = load_data()
-    
-    # Handle edge cases
-    if df.empty:
-        print("No data to display")
-        return
-    
-    # Check for negative sales values
-    if (df['Sales'] < 0).any():
+def create_chart(df, mode='light'):
+    """Create the pie chart figure."""
+    # Keep the largest products and group the rest as "Other", so the
+    # number of wedges stays small. Negative sales are dropped in the same pass
+    df, negative = top_n(df, 'Product', 'Sales', n=TOP_N)
+    if negative:
         print("Warning: Negative sales values detected")
-        # Optionally filter them out
-        df = df[df['Sales'] >= 0]
-    
+
     # Extract labels and values
     labels = df['Product']
     sizes = df['Sales']
-    
-    # Configure style based on MODE
-    if MODE == 'dark':
-        plt.style.use('dark_background')
-        bg_color = '#1e1e1e'
-        text_color = 'white'
-        colors = sns.color_palette("bright", n_colors=len(df))
-    else:  # light mode
-        plt.style.use('default')
-        bg_color = 'white'
-        text_color = 'black'
-        colors = sns.color_palette("pastel", n_colors=len(df))
-    
-    # Create figure with appropriate background
-    fig, ax = plt.subplots(facecolor=bg_color)
-    ax.set_facecolor(bg_color)
-    
+
+    # Create figure
+    fig = Figure()
+    ax = fig.subplots()
+
     # Create pie chart
     wedges, texts, autotexts = ax.pie(
         sizes,
         labels=labels,
-        colors=colors,
         autopct='%1.1f%%',
         startangle=140,
-        textprops={'color': text_color, 'fontsize': 10}
+        textprops={'fontsize': 10}
     )
-    
+
     # Make percentage text bold and slightly larger
     for autotext in autotexts:
-        autotext.set_color(text_color)
         autotext.set_fontweight('bold')
         autotext.set_fontsize(9)
-    
+
     # Add title with spacing
-    ax.set_title('Sales Distribution by Product', 
-                 pad=20, 
-                 fontsize=14, 
-                 fontweight='bold',
-                 color=text_color)
-    
+    ax.set_title('Sales Distribution by Product',
+                 pad=20,
+                 fontsize=14,
+                 fontweight='bold')
+
     # Make sure the pie chart stays circular
     ax.axis('equal')
 
     # Make the figure smaller
-    fig.set_size_inches(6, 4)
-    
-    # Save the figure to output folder
-    OUTPUT_FILE = Path("output") / f"piechart_{MODE}.png"
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(OUTPUT_FILE, dpi=72, bbox_inches='tight', facecolor=bg_color)
-    print(f"Chart saved to: {OUTPUT_FILE} ({MODE} mode)")
-    
-    # Show the plot
-    plt.show()
+    fig.set_size_inches(FIGSIZE)
+
+    # Apply colors for the requested mode
+    apply_theme(fig, mode)
+
+    return fig
+
+
+def apply_theme(fig, mode='light'):
+    """Restyle an existing chart for the given mode."""
+    theme = get_theme(mode)
+
+    ax = fig.axes[0]
+    fig.set_facecolor(theme.bg)
+    ax.set_facecolor(theme.bg)
+
+    # Recolor wedges; "Other" gets a neutral color of its own
+    colors = theme.colors(len(ax.patches))
+    for wedge, color in zip(ax.patches, colors):
+        wedge.set_facecolor(theme.other if wedge.get_label() == OTHER else color)
+
+    # Product labels, percentages and title
+    for text in ax.texts:
+        text.set_color(theme.text)
+    ax.title.set_color(theme.text)
+
+
+def main():
+    # Load data
+    df = load_data()
+
+    # Handle edge cases
+    if df.empty:
+        print("No data to display")
+        return
+
+    # Create chart once
+    fig = create_chart(df, mode=MODE)
+
+    # Save a light and a dark copy to output folder
+    for mode in ('light', 'dark'):
+        apply_theme(fig, mode)
+        OUTPUT_FILE = Path("output") / f"{OUTPUT_NAME}_{mode}.png"
+        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        bbox = tight_bbox(fig, OUTPUT_NAME, DPI)
+        fig.savefig(OUTPUT_FILE, dpi=DPI, bbox_inches=bbox, facecolor=fig.get_facecolor())
+        print(f"Chart saved to: {OUTPUT_FILE} ({mode} mode)")
+
+    # Open a preview window only when asked to
+    if SHOW:
+        apply_theme(fig, MODE)
+        show_figure(fig)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
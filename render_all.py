@@ -0,0 +1,135 @@
+# render_all.py
+"""Render every chart in light and dark mode from a single process."""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import layout
+from charts import (CHARTS, MODES, OUTPUT_DIR, chart_inputs, data_key, get_chart, load_shared_data,
+                    render_chart, use_headless)
+from manifest import is_fresh, load_manifest, record, save_manifest
+
+# Data loaded by a worker process, reused by every job it runs
+_worker_frames = {}
+
+
+def stale_jobs(manifest, names=CHARTS, modes=MODES, force=False):
+    """List the (chart, mode) pairs whose inputs changed since the last render."""
+    return [(name, mode) for name in names for mode in modes
+            if force or not is_fresh(manifest, name, mode)]
+
+
+def render_all(names=CHARTS, modes=MODES, output_dir=OUTPUT_DIR, force=False):
+    """Render the given charts, loading each CSV only once.
+
+    Charts that are up to date according to the manifest in the output
+    folder are skipped unless `force` is set.
+    """
+    manifest = load_manifest(output_dir)
+    jobs = stale_jobs(manifest, names, modes, force)
+    layout.use_file(Path(output_dir) / layout.LAYOUT_NAME)
+
+    # Group stale modes by chart so each figure is still built once
+    todo = {}
+    for name, mode in jobs:
+        todo.setdefault(name, []).append(mode)
+
+    saved = []
+    frames = load_shared_data(list(todo)) if todo else {}
+    for name, chart_modes in todo.items():
+        chart = get_chart(name)
+        for mode, output_file in zip(chart_modes, render_chart(name, frames, chart_modes, output_dir)):
+            print(f"Chart saved to: {output_file}")
+            record(manifest, name, mode, output_file, chart_inputs(chart), chart.DPI, chart.FIGSIZE)
+            saved.append(output_file)
+
+    save_manifest(output_dir, manifest)
+    return saved
+
+
+def render_job(name, mode, output_dir=OUTPUT_DIR):
+    """Render one (chart, mode) pair and return its timing."""
+    start = time.perf_counter()
+    chart = get_chart(name)
+    layout.use_file(Path(output_dir) / layout.LAYOUT_NAME)
+    if data_key(chart) not in _worker_frames:
+        _worker_frames.update(load_shared_data([name]))
+
+    saved = render_chart(name, _worker_frames, (mode,), output_dir)
+    return {
+        "chart": name,
+        "mode": mode,
+        "output_file": str(saved[0]) if saved else None,
+        "seconds": time.perf_counter() - start,
+        "pid": os.getpid(),
+        "inputs": [str(path) for path in chart_inputs(chart)],
+        "dpi": chart.DPI,
+        "figsize": chart.FIGSIZE,
+    }
+
+
+def render_parallel(names=CHARTS, modes=MODES, output_dir=OUTPUT_DIR, workers=None, force=False):
+    """Render every stale (chart, mode) pair across a pool of worker processes.
+
+    Returns one result dict per job, in completion order.
+    """
+    manifest = load_manifest(output_dir)
+    jobs = stale_jobs(manifest, names, modes, force)
+    if not jobs:
+        save_manifest(output_dir, manifest)
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_headless) as pool:
+        futures = [pool.submit(render_job, name, mode, output_dir) for name, mode in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            if result["output_file"]:
+                print(f"Chart saved to: {result['output_file']} ({result['seconds']:.2f}s)")
+                record(manifest, result["chart"], result["mode"], result["output_file"],
+                       result["inputs"], result["dpi"], result["figsize"])
+            results.append(result)
+
+    save_manifest(output_dir, manifest)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("charts", nargs="*", metavar="chart",
+                        help=f"charts to render (default: all). Options: {CHARTS}")
+    parser.add_argument("--mode", choices=MODES, action="append",
+                        help="mode to render, may be repeated (default: both)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR,
+                        help="folder to write images to (default: output)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes, 0 for one per CPU (default: 1, no pool)")
+    parser.add_argument("--force", action="store_true",
+                        help="re-render charts even if their inputs have not changed")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.charts if name not in CHARTS]
+    if unknown:
+        parser.error(f"unknown charts: {unknown}")
+
+    names = args.charts or CHARTS
+    modes = args.mode or MODES
+
+    use_headless()
+    start = time.perf_counter()
+    if args.workers == 1:
+        saved = render_all(names, modes, args.output_dir, force=args.force)
+    else:
+        saved = render_parallel(names, modes, args.output_dir, workers=args.workers or None,
+                                force=args.force)
+    if not saved:
+        print("All charts are up to date")
+    print(f"Finished in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# rendercache.py
+"""Two-tier cache for rendered chart images."""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_DIR = Path("output") / "cache"
+MEMORY_LIMIT_BYTES = 64 * 1024**2
+DISK_LIMIT_BYTES = 1024**3  # Least recently used images are deleted past this
+SOURCES_FILE = "sources.json"  # CSV path -> data hash of the images on disk
+
+
+def cache_key(name, data_hash, mode, fmt, dpi, figsize):
+    """Hash everything that changes a rendered image into one key."""
+    payload = [name, data_hash, mode, fmt, dpi, list(figsize)]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+class RenderCache:
+    """In-memory LRU capped by total bytes, backed by a content-addressed disk store.
+
+    Images are stored on disk as `<cache_dir>/<data hash>/<key>.<format>`,
+    so every image made from one version of a CSV file sits in a single
+    folder that invalidate() can drop at once. The disk store is an LRU
+    too, capped at `max_disk_bytes`; hits refresh a file's mtime so the
+    order survives a restart.
+
+    Methods may be called from several threads, so an event loop can hand
+    the disk work to a thread pool and keep memory hits on the loop.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MEMORY_LIMIT_BYTES, max_disk_bytes=DISK_LIMIT_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()  # key -> (data hash, image bytes)
+        self.memory_bytes = 0
+        self.disk = OrderedDict()    # path -> size, least recently used first
+        self.disk_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                      "evictions": 0, "disk_evictions": 0, "invalidations": 0}
+        self.lock = threading.RLock()
+
+        self.sources = {}
+        if self.cache_dir is not None and (self.cache_dir / SOURCES_FILE).exists():
+            self.sources = json.loads((self.cache_dir / SOURCES_FILE).read_text())
+        if self.cache_dir is not None:
+            files = [(path.stat(), path) for path in self.cache_dir.glob("*/*") if path.suffix != ".tmp"]
+            for stat, path in sorted(files, key=lambda item: item[0].st_mtime_ns):
+                self.disk[path] = stat.st_size
+                self.disk_bytes += stat.st_size
+            self._sweep()
+
+    def _path(self, key, data_hash, fmt):
+        return self.cache_dir / data_hash / f"{key}.{fmt}"
+
+    def get(self, key, data_hash, fmt):
+        """Return a cached image, or None on a miss."""
+        image = self.get_memory(key)
+        if image is None:
+            image = self.get_disk(key, data_hash, fmt)
+        return image
+
+    def get_memory(self, key):
+        """Return an image from the memory tier, or None without counting a miss."""
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is None:
+                return None
+            self.memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return entry[1]
+
+    def get_disk(self, key, data_hash, fmt):
+        """Return an image from the disk tier and keep it in memory, or None on a miss."""
+        if self.cache_dir is not None:
+            path = self._path(key, data_hash, fmt)
+            try:
+                image = path.read_bytes()
+            except OSError:
+                image = None
+            if image is not None:
+                with self.lock:
+                    self._remember(key, data_hash, image)
+                    if path in self.disk:
+                        self.disk.move_to_end(path)
+                        os.utime(path)
+                    self.stats["disk_hits"] += 1
+                return image
+
+        with self.lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key, data_hash, fmt, image, source=None, disk=True):
+        """Store a rendered image in memory and, unless `disk` is False, on disk.
+
+        `source` is the CSV file the image was made from, if any. When its
+        data hash differs from the one recorded, the old images are dropped.
+        """
+        if source is not None:
+            self.track(source, data_hash)
+        with self.lock:
+            self._remember(key, data_hash, image)
+        if disk:
+            self.write(key, data_hash, fmt, image)
+
+    def write(self, key, data_hash, fmt, image):
+        """Store an image in the disk tier only."""
+        if self.cache_dir is None or len(image) > self.max_disk_bytes:
+            return
+        path = self._path(key, data_hash, fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_file.write_bytes(image)
+        tmp_file.replace(path)
+
+        with self.lock:
+            self.disk_bytes += len(image) - self.disk.pop(path, 0)
+            self.disk[path] = len(image)
+            self._sweep()
+
+    def _sweep(self):
+        """Delete the least recently used images until the disk tier fits its cap."""
+        while self.disk_bytes > self.max_disk_bytes:
+            path, size = self.disk.popitem(last=False)
+            self.disk_bytes -= size
+            path.unlink(missing_ok=True)
+            try:
+                path.parent.rmdir()  # Only succeeds once the folder is empty
+            except OSError:
+                pass
+            self.stats["disk_evictions"] += 1
+
+    def _remember(self, key, data_hash, image):
+        """Add an image to the memory tier, evicting the least recently used."""
+        if len(image) > self.max_bytes:
+            return
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key)[1])
+        self.memory[key] = (data_hash, image)
+        self.memory_bytes += len(image)
+
+        while self.memory_bytes > self.max_bytes:
+            _, (_, evicted) = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    def track(self, source, data_hash):
+        """Record the current data hash of a CSV file, invalidating it if it changed."""
+        source = str(source)
+        with self.lock:
+            previous = self.sources.get(source)
+            if previous == data_hash:
+                return
+            if previous is not None:
+                self.invalidate(source)
+            self.sources[source] = data_hash
+            self._save_sources()
+
+    def invalidate(self, source):
+        """Drop every cached image made from a CSV file."""
+        with self.lock:
+            data_hash = self.sources.pop(str(source), None)
+            if data_hash is None:
+                return
+
+            for key in [key for key, (entry_hash, _) in self.memory.items() if entry_hash == data_hash]:
+                self.memory_bytes -= len(self.memory.pop(key)[1])
+            if self.cache_dir is not None:
+                folder = self.cache_dir / data_hash
+                for path in [path for path in self.disk if path.parent == folder]:
+                    self.disk_bytes -= self.disk.pop(path)
+                shutil.rmtree(folder, ignore_errors=True)
+            self._save_sources()
+            self.stats["invalidations"] += 1
+
+    def _save_sources(self):
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        sources_file = self.cache_dir / SOURCES_FILE
+        tmp_file = sources_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(self.sources, indent=2, sort_keys=True))
+        tmp_file.replace(sources_file)
+
+    def info(self):
+        """Return the counters plus the current memory and disk use."""
+        with self.lock:
+            return {**self.stats, "entries": len(self.memory), "memory_bytes": self.memory_bytes,
+                    "disk_entries": len(self.disk), "disk_bytes": self.disk_bytes}
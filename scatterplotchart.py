@@ -1,87 +1,154 @@
 # scatterplotchart.py
 """Scatter Plot Chart."""
 
+import numpy as np
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
 from pathlib import Path
 
+from chartdata import load_columns
+from charts import show_figure
+from layout import tight_bbox
+from themes import get_theme
+
 # ============================================
 # CONFIGURATION - Change mode here
 # ============================================
 MODE = 'dark'  # Options: 'dark' or 'light'
+SHOW = False    # Open a preview window after saving
 # ============================================
 
+CSV_FILE = Path("data") / "monthly_sales.csv"
+DATA_KEY = 'rows'  # Charts with the same CSV_FILE and DATA_KEY share one loaded frame
+OUTPUT_NAME = "scatterplotchart"
+DPI = 72
+FIGSIZE = (6, 4)
+
+# High-volume mode: points are binned and drawn as one density image
+DENSITY_THRESHOLD = 100_000  # Switch to density above this many points
+DENSITY_BIN_PIXELS = 4       # Width of one density bin in output pixels
+COUNT_COLUMN = 'Count'       # Rows with this column are pre-binned counts
 
-def load_data():
+
+def load_data(csv_file=CSV_FILE):
     """Load data from CSV file."""
-    CSV_FILE = Path("data") / "monthly_sales.csv"
-    
     # Check if file exists
-    if not CSV_FILE.exists():
-        raise FileNotFoundError(f"{CSV_FILE} not found")
-    
-    # Load the dataframe
-    df = pd.read_csv(CSV_FILE)
-    
-    # Validate required columns
+    if not csv_file.exists():
+        raise FileNotFoundError(f"{csv_file} not found")
+
+    # Every row is a point, so only the plotted columns are read
+    df = load_columns(csv_file, ['Month', 'Sales'])
+    validate_data(df)
+    return df
+
+
+def validate_data(df):
+    """Validate required columns and types."""
     required_cols = ['Month', 'Sales']
     if not all(col in df.columns for col in required_cols):
         raise ValueError(f"CSV must contain columns: {required_cols}")
-    
+
     # Validate Sales column is numeric
     if not pd.api.types.is_numeric_dtype(df['Sales']):
         raise ValueError("Sales column must contain numeric values")
-    
-    return df
 
 
-def main():
-    # Load data
-    df = load_data()
-    
-    # Handle edge cases
-    if df.empty:
-        print("No data to display")
-        return
-    
-    # Configure style based on MODE
-    if MODE == 'dark':
-        plt.style.use('dark_background')
-        bg_color = '#1e1e1e'
-        text_color = 'white'
-        grid_color = 'gray'
-        point_color = sns.color_palette("bright")[2]
-    else:  # light mode
-        plt.style.use('default')
-        bg_color = 'white'
-        text_color = 'black'
-        grid_color = 'gray'
-        point_color = sns.color_palette("pastel")[2]
-    
-    # Create figure and axis with appropriate background
-    fig, ax = plt.subplots(figsize=(6, 4), facecolor=bg_color)
-    ax.set_facecolor(bg_color)
-    
-    # Create scatter plot
-    ax.scatter(df['Month'], 
-               df['Sales'], 
-               color=point_color, 
-               alpha=1.0, 
-               s=100  # Size of points
-               )
-    
+def bin_points(x, y, bins, weights=None, x_range=None):
+    """Count points on a regular 2D grid.
+
+    Returns (counts, x_edges, y_edges) like np.histogram2d, with counts
+    shaped (x bins, y bins). Bin numbers are computed arithmetically and
+    counted with a single bincount, which is much faster than
+    np.histogram2d for tens of millions of points. `weights` adds up a
+    value per point instead of counting, for pre-aggregated input.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+        weights = None if weights is None else np.asarray(weights)[keep]
+
+    def edges(values, n, value_range=None):
+        lo, hi = value_range or (values.min(), values.max())
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        return np.linspace(lo, hi, n + 1)
+
+    nx, ny = bins
+    x_edges = edges(x, nx, x_range)
+    y_edges = edges(y, ny)
+
+    ix = ((x - x_edges[0]) * (nx / (x_edges[-1] - x_edges[0]))).astype(np.intp)
+    iy = ((y - y_edges[0]) * (ny / (y_edges[-1] - y_edges[0]))).astype(np.intp)
+    np.clip(ix, 0, nx - 1, out=ix)  # The maximum falls in the last bin
+    np.clip(iy, 0, ny - 1, out=iy)
+
+    counts = np.bincount(ix * ny + iy, weights=weights, minlength=nx * ny)
+    return counts.reshape(nx, ny), x_edges, y_edges
+
+
+def plot_density(ax, counts, x_edges, y_edges):
+    """Draw binned counts as one image, leaving empty bins transparent."""
+    counts = np.ma.masked_less_equal(np.asarray(counts, dtype=float).T, 0)
+    return ax.imshow(
+        counts,
+        extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+        origin='lower',
+        aspect='auto',
+        interpolation='nearest',
+        norm=LogNorm(),  # Densities span orders of magnitude
+    )
+
+
+def create_chart(df, mode='light', x='Month', y='Sales', density=None):
+    """Create the scatter plot figure.
+
+    With more than DENSITY_THRESHOLD points, or when `df` has a Count
+    column of pre-binned totals, the points are binned into a density
+    image instead of drawing one marker each. Pass `density` to force
+    either mode.
+    """
+    if density is None:
+        density = COUNT_COLUMN in df.columns or len(df) > DENSITY_THRESHOLD
+
+    # Create figure and axis
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.subplots()
+
+    if density:
+        # Text categories (such as months) get one column of bins each
+        x_values, categories, x_range = df[x].to_numpy(), None, None
+        nx = int(FIGSIZE[0] * DPI / DENSITY_BIN_PIXELS)
+        if not pd.api.types.is_numeric_dtype(df[x]):
+            x_values, categories = pd.factorize(df[x])
+            nx, x_range = len(categories), (-0.5, len(categories) - 0.5)
+
+        weights = df[COUNT_COLUMN].to_numpy() if COUNT_COLUMN in df.columns else None
+        counts, x_edges, y_edges = bin_points(x_values, df[y].to_numpy(),
+                                              (nx, int(FIGSIZE[1] * DPI / DENSITY_BIN_PIXELS)),
+                                              weights=weights, x_range=x_range)
+        image = plot_density(ax, counts, x_edges, y_edges)
+        fig.colorbar(image, ax=ax, label='Points')
+        if categories is not None:
+            ax.set_xticks(range(len(categories)), categories)
+    else:
+        # Create scatter plot
+        ax.scatter(df[x],
+                   df[y],
+                   alpha=1.0,
+                   s=100  # Size of points
+                   )
+
     # Add title and axis labels
-    ax.set_title('Sales Scatter Plot', pad=20, color=text_color)
-    ax.set_xlabel('Month', color=text_color)
-    ax.set_ylabel('Sales', color=text_color)
-    
-    # Set tick colors
-    ax.tick_params(colors=text_color, which='both')
-    
+    ax.set_title('Sales Scatter Plot', pad=20)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+
     # Add grid for better readability
-    ax.grid(True, linestyle='-', alpha=0.3, color=grid_color)
-    
+    ax.grid(True, linestyle='-', alpha=0.3)
+
     # Remove outside border (spines)
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
@@ -89,19 +156,88 @@ def main():
     ax.spines['left'].set_visible(False)
 
     # Rotate x-axis labels if they're text to prevent overlap
-    plt.xticks(rotation=45, ha='right')
-    
-    # Save the figure to output folder
-    OUTPUT_FILE = Path("output") / f"scatterplotchart_{MODE}.png"
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(OUTPUT_FILE, dpi=72, bbox_inches='tight', facecolor=bg_color)
-    print(f"Chart saved to: {OUTPUT_FILE} ({MODE} mode)")
-    
-    # Show the plot
-    plt.show()
-    
-    # Clean up
-    plt.close(fig)
+    for label in ax.get_xticklabels():
+        label.set(rotation=45, ha='right')
+
+    # Apply colors for the requested mode
+    apply_theme(fig, mode)
+
+    return fig
+
+
+def update_chart(fig, df, x='Month', y='Sales'):
+    """Show new points on a scatter plot made by create_chart().
+
+    Only the point positions and the axis limits change. Density charts
+    raise ValueError, as their bins and colorbar have to be rebuilt.
+    """
+    ax = fig.axes[0]
+    if ax.images or COUNT_COLUMN in df.columns or len(df) > DENSITY_THRESHOLD:
+        raise ValueError("Density charts are rebuilt for new data")
+
+    points = ax.collections[0]
+    points.set_offsets(np.column_stack([ax.xaxis.convert_units(df[x].to_numpy()),
+                                        ax.yaxis.convert_units(df[y].to_numpy())]))
+
+    # Limits from the points only, as ax.scatter() sets them
+    ax.relim()
+    ax.update_datalim(points.get_datalim(ax.transData).get_points())
+    ax.autoscale_view()
+
+
+def apply_theme(fig, mode='light'):
+    """Restyle an existing chart for the given mode."""
+    theme = get_theme(mode)
+
+    ax = fig.axes[0]
+    fig.set_facecolor(theme.bg)
+    ax.set_facecolor(theme.bg)
+
+    # Recolor points, or the density image in high-volume mode
+    for collection in ax.collections:
+        collection.set_color(theme.palette[2])
+    for image in ax.images:
+        image.set_cmap(theme.density_cmap)
+
+    # Title, labels, ticks and grid
+    ax.title.set_color(theme.text)
+    ax.xaxis.label.set_color(theme.text)
+    ax.yaxis.label.set_color(theme.text)
+    ax.tick_params(colors=theme.text, which='both', grid_color=theme.grid)
+
+    # Style the density colorbar
+    if ax.images:
+        cbar = fig.axes[-1]  # The colorbar is the last axis
+        cbar.tick_params(colors=theme.text, which='both')
+        cbar.yaxis.label.set_color(theme.text)
+        cbar.spines['outline'].set_edgecolor(theme.text)
+
+
+def main():
+    # Load data
+    df = load_data()
+
+    # Handle edge cases
+    if df.empty:
+        print("No data to display")
+        return
+
+    # Create chart once
+    fig = create_chart(df, mode=MODE)
+
+    # Save a light and a dark copy to output folder
+    for mode in ('light', 'dark'):
+        apply_theme(fig, mode)
+        OUTPUT_FILE = Path("output") / f"{OUTPUT_NAME}_{mode}.png"
+        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        bbox = tight_bbox(fig, OUTPUT_NAME, DPI)
+        fig.savefig(OUTPUT_FILE, dpi=DPI, bbox_inches=bbox, facecolor=fig.get_facecolor())
+        print(f"Chart saved to: {OUTPUT_FILE} ({mode} mode)")
+
+    # Open a preview window only when asked to
+    if SHOW:
+        apply_theme(fig, MODE)
+        show_figure(fig)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,290 @@
+# server.py
+"""Serve the charts over HTTP from a pool of pre-warmed render processes.
+
+    python server.py --port 8000 --workers 4
+
+    GET  /charts/barchart.png?mode=dark   render from the chart's CSV file
+    POST /charts/piechart.svg?mode=light  render from a CSV request body
+    GET  /stats                           counters as JSON
+
+Matplotlib is not thread-safe, so every render runs in a worker process.
+Hashing data files and reading or writing the disk cache run in threads,
+so the event loop only ever waits on the network.
+Finished images are kept in a memory and disk cache keyed by chart, data
+hash, mode, format, dpi and figure size; renders of a POST body are only
+kept in memory. Identical requests that arrive while a render is in
+flight share that one render. When too many renders are queued, new ones
+are refused with 503 instead of piling up.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from chartdata import source_file
+from charts import (CHARTS, CONTENT_TYPES, MODES, data_key, get_chart, load_shared_data, render_bytes,
+                    use_headless)
+from manifest import fingerprint
+from rendercache import CACHE_DIR, DISK_LIMIT_BYTES, MEMORY_LIMIT_BYTES, RenderCache, cache_key
+
+HOST = "127.0.0.1"
+PORT = 8000
+MAX_PENDING_PER_WORKER = 4  # Queued renders per worker before answering 503
+MAX_BODY_BYTES = 16 * 1024**2
+RETRY_AFTER_SECONDS = 1
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+# Worker process state: data_key() -> (sha256, dataframe)
+_worker_frames = {}
+
+
+def _warm_worker():
+    """Import the plotting stack and every chart module once per worker."""
+    use_headless()
+    import geopandas  # noqa: F401  (map.py imports it on first use)
+    for name in CHARTS:
+        get_chart(name)
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+def render_job(name, mode, fmt, data_hash, csv_bytes=None):
+    """Render one chart in a worker process and return the image bytes.
+
+    Without `csv_bytes` the chart's own CSV file is used; it is loaded once
+    per worker and reloaded only when `data_hash` changes.
+    """
+    if csv_bytes is not None:
+        import pandas as pd
+        df = pd.read_csv(io.BytesIO(csv_bytes))
+    else:
+        chart = get_chart(name)
+        key = data_key(chart)
+        cached = _worker_frames.get(key)
+        if cached is None or cached[0] != data_hash:
+            _worker_frames[key] = (data_hash, load_shared_data([name])[key])
+        df = _worker_frames[key][1]
+    return render_bytes(name, df, mode, fmt)
+
+
+class Overloaded(Exception):
+    """Raised when the render queue is full."""
+
+
+class ChartService:
+    """Coalescing front end for a pool of render processes."""
+
+    def __init__(self, workers=None, max_pending=None, cache=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * MAX_PENDING_PER_WORKER
+        self.cache = cache if cache is not None else RenderCache()
+        self.pool = None
+        self.in_flight = {}     # cache key -> Future
+        self.fingerprints = {}  # CSV path -> last fingerprint
+        self.stats = {"requests": 0, "renders": 0, "coalesced": 0, "rejected": 0, "errors": 0}
+
+    async def start(self):
+        """Start the pool and wait until every worker has warmed up."""
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        for name in CHARTS:
+            get_chart(name)  # Cache keys need each chart's CSV_FILE, DPI and FIGSIZE
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _worker_ready)
+                               for _ in range(self.workers)))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def data_hash(self, name, csv_bytes=None):
+        """Hash the request body, or the chart's data file when there is none.
+
+        The data file is the CSV, or the columnar copy read in its place. A
+        CSV file whose hash changed has its cached images invalidated.
+        """
+        if csv_bytes is not None:
+            return hashlib.sha256(csv_bytes).hexdigest()
+        csv_file = get_chart(name).CSV_FILE
+        self.fingerprints[csv_file] = fingerprint(source_file(csv_file), self.fingerprints.get(csv_file))
+        data_hash = self.fingerprints[csv_file]["sha256"]
+        self.cache.track(csv_file, data_hash)
+        return data_hash
+
+    async def render(self, name, mode, fmt, csv_bytes=None):
+        """Return the image bytes from the cache, an identical render in flight, or a new render."""
+        chart = get_chart(name)
+        data_hash = await asyncio.to_thread(self.data_hash, name, csv_bytes)
+        key = cache_key(name, data_hash, mode, fmt, chart.DPI, chart.FIGSIZE)
+        image = self.cache.get_memory(key)
+        if image is None:
+            image = await asyncio.to_thread(self.cache.get_disk, key, data_hash, fmt)
+        if image is not None:
+            return image
+
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        if len(self.in_flight) >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise Overloaded()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, render_job, name, mode, fmt, data_hash, csv_bytes)
+        self.in_flight[key] = future
+
+        def finished(future):
+            # Cache from the callback so a client that hangs up still fills the cache.
+            # The disk write runs in a thread; one-off POST bodies stay in memory
+            # so they cannot fill the disk
+            self.in_flight.pop(key, None)
+            if not future.cancelled() and future.exception() is None:
+                self.cache.put(key, data_hash, fmt, future.result(), disk=False)
+                if csv_bytes is None:
+                    loop.run_in_executor(None, self.cache.write, key, data_hash, fmt, future.result())
+
+        future.add_done_callback(finished)
+        self.stats["renders"] += 1
+        return await asyncio.shield(future)
+
+    async def handle(self, method, target, body):
+        """Answer one request and return (status, content type, body)."""
+        self.stats["requests"] += 1
+        url = urlsplit(target)
+
+        if url.path == "/stats":
+            stats = {**self.stats, "in_flight": len(self.in_flight), "workers": self.workers,
+                     "cache": self.cache.info()}
+            return 200, "application/json", json.dumps(stats).encode()
+
+        if not url.path.startswith("/charts/"):
+            return 404, "text/plain", b"Not found"
+        if method not in ("GET", "POST"):
+            return 405, "text/plain", b"Use GET or POST"
+
+        name, _, fmt = url.path.removeprefix("/charts/").partition(".")
+        if name not in CHARTS:
+            return 404, "text/plain", f"Unknown chart '{name}'. Options: {CHARTS}".encode()
+        fmt = fmt or "png"
+        if fmt not in CONTENT_TYPES:
+            return 404, "text/plain", f"Unknown format '{fmt}'. Options: {list(CONTENT_TYPES)}".encode()
+        mode = parse_qs(url.query).get("mode", ["light"])[0]
+        if mode not in MODES:
+            return 400, "text/plain", f"Unknown mode '{mode}'. Options: {list(MODES)}".encode()
+
+        try:
+            image = await self.render(name, mode, fmt, body if method == "POST" else None)
+        except Overloaded:
+            return 503, "text/plain", b"Too many renders queued, retry later"
+        except ValueError as e:
+            self.stats["errors"] += 1
+            return 400, "text/plain", str(e).encode()
+        except Exception as e:
+            self.stats["errors"] += 1
+            return 500, "text/plain", f"{type(e).__name__}: {e}".encode()
+        return 200, CONTENT_TYPES[fmt], image
+
+    async def serve_connection(self, reader, writer):
+        """Handle HTTP/1.1 requests on one connection until it closes."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    status, content_type, payload = 413, "text/plain", b"Request body too large"
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, content_type, payload = await self.handle(method, target, body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+
+                response = [
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(payload)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if status == 503:
+                    response.append(f"Retry-After: {RETRY_AFTER_SECONDS}")
+                writer.write(("\r\n".join(response) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Client went away or sent something unparseable
+        finally:
+            writer.close()
+
+
+async def serve(host=HOST, port=PORT, workers=None, max_pending=None, cache=None):
+    """Run the chart service until cancelled."""
+    service = ChartService(workers, max_pending, cache)
+    start = time.perf_counter()
+    await service.start()
+    print(f"{service.workers} render workers ready in {time.perf_counter() - start:.2f}s")
+
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    print(f"Serving charts on http://{host}:{port}/charts/<chart>.<format>?mode=<mode>")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST, help=f"address to listen on (default: {HOST})")
+    parser.add_argument("--port", type=int, default=PORT, help=f"port to listen on (default: {PORT})")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="render processes, 0 for one per CPU (default: 0)")
+    parser.add_argument("--max-pending", type=int, default=0,
+                        help=f"queued renders before answering 503 "
+                             f"(default: {MAX_PENDING_PER_WORKER} per worker)")
+    parser.add_argument("--cache-mb", type=float, default=MEMORY_LIMIT_BYTES / 1024**2,
+                        help="memory cache size in MB (default: %(default)g)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR,
+                        help="folder for the disk cache (default: %(default)s)")
+    parser.add_argument("--disk-cache-mb", type=float, default=DISK_LIMIT_BYTES / 1024**2,
+                        help="disk cache size in MB (default: %(default)g)")
+    parser.add_argument("--no-disk-cache", action="store_true", help="keep rendered images in memory only")
+    args = parser.parse_args()
+
+    cache = RenderCache(None if args.no_disk_cache else args.cache_dir, int(args.cache_mb * 1024**2),
+                        int(args.disk_cache_mb * 1024**2))
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers or None, args.max_pending or None, cache))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
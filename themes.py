@@ -0,0 +1,88 @@
+# themes.py
+"""Light and dark color themes shared by the chart scripts.
+
+Themes are frozen and built once at import time. Charts apply them
+directly to their artists, so no global matplotlib state is changed and
+light and dark figures can be styled at the same time.
+"""
+
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+from matplotlib.colors import to_rgba_array
+
+# seaborn's "pastel" and "bright" palettes, copied so seaborn is not imported
+PASTEL = ("#a1c9f4", "#ffb482", "#8de5a1", "#ff9f9b", "#d0bbff",
+          "#debb9b", "#fab0e4", "#cfcfcf", "#fffea3", "#b9f2f0")
+BRIGHT = ("#023eff", "#ff7c00", "#1ac938", "#e8000b", "#8b2be2",
+          "#9f4800", "#f14cc1", "#a3a3a3", "#ffc400", "#00d7ff")
+
+
+@dataclass(frozen=True)
+class Theme:
+    """Colors for one mode."""
+    name: str
+    bg: str             # Figure and axes background
+    text: str           # Titles, labels, ticks and annotations
+    grid: str
+    edge: str           # Bar outlines
+    palette: tuple      # Category colors
+    other: str          # The "Other" wedge of pie and donut charts
+    scale_text: str     # Gauge scale markers
+    gauge_track: str    # Unfilled part of a gauge
+    gauge_value: str    # Filled part of a gauge
+    border: str         # Map state borders
+    missing: str        # Map states without data
+    density_cmap: str   # Scatter plot density mode
+
+    @functools.cached_property
+    def palette_rgba(self):
+        """The palette as an (N, 4) RGBA array, converted once."""
+        return to_rgba_array(self.palette)
+
+    def colors(self, n):
+        """Return an (n, 4) RGBA array of palette colors, cycling through the palette."""
+        return np.resize(self.palette_rgba, (n, 4))
+
+
+LIGHT = Theme(
+    name='light',
+    bg='white',
+    text='black',
+    grid='gray',
+    edge='gray',
+    palette=PASTEL,
+    other='#e8e8e8',
+    scale_text='#333333',
+    gauge_track='#dcdbdb',
+    gauge_value='#84d9e0',
+    border='black',
+    missing='#eaeaea',
+    density_cmap='Blues',
+)
+
+DARK = Theme(
+    name='dark',
+    bg='#1e1e1e',
+    text='white',
+    grid='gray',
+    edge='#555555',
+    palette=BRIGHT,
+    other='#6b6b6b',
+    scale_text='#cccccc',
+    gauge_track='#3a3a3a',
+    gauge_value='#42a5f5',  # Brighter blue for dark mode
+    border='#555555',
+    missing='#2a2a2a',
+    density_cmap='viridis',
+)
+
+THEMES = {theme.name: theme for theme in (LIGHT, DARK)}
+
+
+def get_theme(mode):
+    """Return the theme for a mode name."""
+    if mode not in THEMES:
+        raise ValueError(f"Unknown mode '{mode}'. Options: {list(THEMES)}")
+    return THEMES[mode]